@@ -0,0 +1,124 @@
+"""/claim load test against the local Mojang/Hypixel stand-in.
+
+Starts bench/upstream.py in-process, points main.py's Mojang and Hypixel
+clients at it (MOJANG_API_URL / HYPIXEL_API_URL) and fires ``--claims``
+concurrent /claim interactions spread over ``--players`` linked players, each
+with pending rewards.  A share of the players are legacy links without a
+stored UUID, so their first claim goes through Mojang.
+
+    python bench/claim_load.py --claims 5000 --players 1000
+    python bench/claim_load.py --rate-limit 300 --error-rate 0.02   # production-like key
+    python bench/claim_load.py --workers 2      # lookups in worker processes
+
+Reports claim latency percentiles, how the claims ended, upstream request
+counts and how many times the Elo table was written.
+"""
+import argparse
+import asyncio
+import os
+import random
+from collections import Counter
+
+from harness import Recorder, add_pending, boot, load_main, make_guild, quiet, shutdown
+from fakes import FakeInteraction, Latency
+from upstream import add_arguments, from_args, player_uuid
+
+import metrics
+
+
+def seed(main, guild, players, legacy):
+    members = []
+    rewards = {}
+    for i in range(players):
+        member = guild.add_member()
+        uid = str(member.id)
+        name = f"Player{i:05d}"
+        if random.random() < legacy:
+            main.links.link(uid, name)
+        else:
+            main.links.link(uid, name, uuid=player_uuid(name))
+        main.set_elo(uid, 1000)
+        rewards[uid] = [(random.randint(0, 3000) + 10, random.randint(0, 1000) + 5, 15) for _ in range(3)]
+        members.append(member)
+    return members, rewards
+
+
+async def run(args):
+    random.seed(args.seed)
+    upstream = from_args(args)
+    url = await upstream.start()
+    os.environ["MOJANG_API_URL"] = url
+    os.environ["HYPIXEL_API_URL"] = url
+
+    main = load_main()
+    guild = make_guild(main, Latency(args.latency / 1000, args.jitter / 1000))
+    with quiet(not args.verbose):
+        await boot(main)
+    await main.http.start()
+    main.hypixel.api_key = "bench"
+    if args.workers:
+        main.workers.spawn(args.workers, env={"HYPIXEL_API_KEY": "bench", "MOJANG_API_URL": url, "HYPIXEL_API_URL": url})
+        await main.workers.start()
+
+    members, rewards = seed(main, guild, args.players, args.legacy)
+    await add_pending(main, rewards)
+    await main.store.flush()
+    metrics.REGISTRY.reset()
+    upstream.requests.clear()
+    upstream.statuses.clear()
+
+    text = guild.get_channel(main.ALLOWED_TEXT_CHANNEL_ID)
+    claims = Recorder("/claim")
+    outcomes = Counter()
+    sem = asyncio.Semaphore(args.concurrency) if args.concurrency else None
+
+    async def claim(member):
+        inter = FakeInteraction(guild, member, text)
+        if sem:
+            async with sem:
+                await claims.time(main.claim.callback(inter))
+        else:
+            await claims.time(main.claim.callback(inter))
+        outcomes[(inter.last_message or "").split("!")[0].split("(")[0].strip()[:60]] += 1
+
+    try:
+        with quiet(not args.verbose):
+            await asyncio.gather(*(claim(random.choice(members)) for _ in range(args.claims)))
+            claims.stop()
+            await main.store.flush()
+    finally:
+        with quiet(not args.verbose):
+            await shutdown(main)
+            await main.workers.close()
+            await main.http.close()
+            await upstream.close()
+
+    elo_writes = metrics.REGISTRY.histograms.get("storage_write_seconds", {}).get((("table", "elo"),))
+    print(claims.report())
+    print("outcomes:")
+    for text, count in outcomes.most_common():
+        print(f"  {count:>6}  {text}")
+    print("upstream requests: " + ", ".join(f"{k}={v}" for k, v in sorted(upstream.requests.items())))
+    print("upstream statuses: " + ", ".join(f"{k}={v}" for k, v in sorted(upstream.statuses.items())))
+    print(f"elo table writes: {elo_writes.count if elo_writes else 0} for {args.claims} claims")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--legacy", type=float, default=0.1, help="share of links without a stored UUID")
+    parser.add_argument("--concurrency", type=int, default=0, help="max claims in flight (0 = all at once)")
+    parser.add_argument("--latency", type=float, default=5.0, help="fake Discord latency (ms)")
+    parser.add_argument("--jitter", type=float, default=5.0, help="extra random Discord latency (ms)")
+    parser.add_argument("--workers", type=int, default=0, help="run the lookups in N worker processes (workers.py)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the bot's own output")
+    add_arguments(parser)
+    # measure our side by default; --rate-limit 300 reproduces a production key
+    parser.set_defaults(rate_limit=100000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
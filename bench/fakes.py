@@ -0,0 +1,237 @@
+"""In-process stand-ins for the parts of discord.py the handlers touch.
+
+Only what main.py actually uses is modelled: guilds with members, voice and
+text channels, ``member.move_to`` (which fires on_voice_state_update like the
+gateway would), ``channel.send`` and interactions with ``response`` /
+``followup``.  Every REST-like call sleeps for ``Latency`` so the numbers
+include the awaits the real bot would do.
+"""
+import asyncio
+import itertools
+import random
+from types import SimpleNamespace
+
+import discord
+
+_ids = itertools.count(10**17)
+
+
+def next_id():
+    return next(_ids)
+
+
+class Latency:
+    def __init__(self, base=0.005, jitter=0.005):
+        self.base = base
+        self.jitter = jitter
+        self.calls = 0
+
+    async def wait(self):
+        self.calls += 1
+        delay = self.base + random.random() * self.jitter
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class VoiceState:
+    __slots__ = ("channel",)
+
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakeUser:
+    def __init__(self, uid, name):
+        self.id = uid
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{uid}>"
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, uid, name):
+        super().__init__(uid, name)
+        self.guild = guild
+        self.voice = None
+
+    async def move_to(self, channel):
+        await self.guild.latency.wait()
+        if self.voice is None:
+            response = SimpleNamespace(status=400, reason="Bad Request")
+            raise discord.HTTPException(response, "Target user is not connected to voice.")
+        self.guild.set_voice(self, channel)
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild, cid, name, category=None):
+        self.id = cid
+        self.name = name
+        self.guild = guild
+        self.category = category
+        self._members = {}
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    async def delete(self):
+        await self.guild.latency.wait()
+        self.guild.channels.pop(self.id, None)
+        if self.category is not None:
+            self.category.voice_channels.remove(self)
+
+
+class FakeTextChannel:
+    def __init__(self, guild, cid, name):
+        self.id = cid
+        self.name = name
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.latency.wait()
+        self.sent += 1
+
+
+class FakeCategory:
+    def __init__(self, guild, cid, name):
+        self.id = cid
+        self.name = name
+        self.guild = guild
+        self.voice_channels = []
+
+
+class FakeGuild:
+    def __init__(self, gid, latency=None, on_voice_state_update=None):
+        self.id = gid
+        self.latency = latency or Latency()
+        self.on_voice_state_update = on_voice_state_update
+        self.channels = {}
+        self.members = {}
+
+    # === SETUP ===
+    def add_member(self, uid=None, name=None):
+        uid = uid or next_id()
+        member = self.members[uid] = FakeMember(self, uid, name or f"player{uid % 100000}")
+        return member
+
+    def add_voice_channel(self, cid=None, name="voice", category=None):
+        vc = FakeVoiceChannel(self, cid or next_id(), name, category)
+        self.channels[vc.id] = vc
+        if category is not None:
+            category.voice_channels.append(vc)
+        return vc
+
+    def add_text_channel(self, cid=None, name="text"):
+        channel = FakeTextChannel(self, cid or next_id(), name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def add_category(self, cid=None, name="category"):
+        category = FakeCategory(self, cid or next_id(), name)
+        self.channels[category.id] = category
+        return category
+
+    # === DISCORD SURFACE ===
+    def get_member(self, uid):
+        return self.members.get(uid)
+
+    def get_channel(self, cid):
+        return self.channels.get(cid)
+
+    async def create_voice_channel(self, name, category=None):
+        await self.latency.wait()
+        return self.add_voice_channel(name=name, category=category)
+
+    # === VOICE ===
+    def set_voice(self, member, channel):
+        """Move ``member`` (channel None = disconnect) and fire the event the
+        gateway would send."""
+        before = VoiceState(member.voice.channel if member.voice else None)
+        if before.channel is not None:
+            before.channel._members.pop(member.id, None)
+        if channel is None:
+            member.voice = None
+        else:
+            channel._members[member.id] = member
+            member.voice = VoiceState(channel)
+        if self.on_voice_state_update is not None:
+            asyncio.get_running_loop().create_task(
+                self.on_voice_state_update(member, before, VoiceState(channel))
+            )
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise RuntimeError("interaction already responded to")
+        await self._interaction.guild.latency.wait()
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._interaction.last_message = content
+        await self._respond()
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def edit_message(self, content=None, **kwargs):
+        self._interaction.last_message = content
+        await self._respond()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction.guild.latency.wait()
+        self._interaction.last_message = content
+
+
+class FakeClient:
+    def __init__(self, guild):
+        self.guild = guild
+
+    async def fetch_user(self, uid):
+        await self.guild.latency.wait()
+        return FakeUser(uid, f"user{uid % 100000}")
+
+
+class FakeInteraction:
+    def __init__(self, guild, user, channel):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.client = FakeClient(guild)
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.extras = {}
+        self.command = None
+        self.last_message = None
+
+
+class FakeStats:
+    """Stands in for HypixelClient.bedwars_stats: every player is already
+    past any pending threshold."""
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency(0.05, 0.05)
+        self.calls = 0
+
+    async def bedwars_stats(self, uuid):
+        self.calls += 1
+        await self.latency.wait()
+        return 10**6, 10**6
+
+    def forget(self, uuid):
+        pass
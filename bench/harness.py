@@ -0,0 +1,148 @@
+"""Loads main.py against a throwaway data directory and a fake guild.
+
+The bot never logs in: ``boot()`` does the state part of setup_hook (load
+the store, build the indexes, start the flush and expiry tasks) plus on_ready's
+hand-over of the legacy config and parties to the fake guild, which owns the
+hard-coded channels.  The fake guild's voice events go to
+main.on_voice_state_update.
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from fakes import FakeClient, FakeGuild, Latency, next_id  # noqa: E402
+
+
+def load_main(workdir=None):
+    """Import main.py with its data files in ``workdir`` (a new temp dir by
+    default).  The metrics endpoint is turned off."""
+    workdir = workdir or tempfile.mkdtemp(prefix="ranked-bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("STORAGE_BACKEND", "json")
+    os.environ["METRICS_PORT"] = "0"
+    with open("api.json", "w") as f:
+        json.dump({"hypixel_api_key": "bench"}, f)
+    return importlib.import_module("main")
+
+
+def make_guild(main, latency=None):
+    guild = FakeGuild(next_id(), latency or Latency(), on_voice_state_update=main.on_voice_state_update)
+    for vc_id in {main.VC1_ID, main.VC2_ID, main.VC3_ID, main.VC4_ID, main.QUEUE_VC_ID, *main.QUEUE_VC_IDS,
+                  *(v for pairs in main.TEAM_VC_PAIRS.values() for p in pairs for v in p)}:
+        guild.add_voice_channel(vc_id, name=f"vc-{vc_id % 1000}")
+    guild.add_text_channel(main.ALLOWED_TEXT_CHANNEL_ID, name="party")
+    guild.add_text_channel(main.PARTY_CHAT_CHANNEL_ID, name="commands")
+    guild.add_category(main.TEMP_VC_CATEGORY_ID, name="temp")
+    main.bot.get_guild = lambda gid: guild if gid == guild.id else None
+    main.bot.get_channel = guild.get_channel
+    main.profiles.client = FakeClient(guild)
+    return guild
+
+
+async def boot(main):
+    await main.store.load()
+    main.links.rebuild()
+    main.ranks.rebuild(main.elo_data)
+    main.load_parties()
+    main.adopt_legacy_setup()
+    main.store.start()
+    main.expiry.start()
+
+
+async def shutdown(main):
+    for state in main.guild_states.values():
+        state.stop()
+    await main.dispatcher.close()
+    await main.store.close()
+
+
+def seed_players(main, guild, count, elo=True):
+    """Add ``count`` linked members (with UUIDs) to the guild."""
+    members = []
+    for i in range(count):
+        member = guild.add_member()
+        uid = str(member.id)
+        main.links.link(uid, f"Player{i:05d}", uuid=f"{i:032x}")
+        if elo:
+            main.set_elo(uid, 800 + (i * 37) % 900)
+        members.append(member)
+    return members
+
+
+async def add_pending(main, rewards):
+    """Append ``{uid: [(expected_kills, expected_finals, elo_change)]}`` to
+    pending_elo.json the way the game server does, then let the store pick it up."""
+    await main.store.flush()
+    data = {}
+    if os.path.exists(main.PENDING_FILE):
+        with open(main.PENDING_FILE) as f:
+            data = json.load(f)
+    for uid, entries in rewards.items():
+        data.setdefault(uid, []).extend(
+            {"expected_kills": kills, "expected_finals": finals, "elo_change": elo}
+            for kills, finals, elo in entries
+        )
+    with open(main.PENDING_FILE, "w") as f:
+        json.dump(data, f, indent=4)
+    await main.store.refresh("pending")
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    # the handlers print a line per match/move; keep the report readable
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class Recorder:
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    async def time(self, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.add(time.perf_counter() - start)
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        n = len(self.samples)
+        if not n:
+            return f"{self.name:<22} no samples"
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            return ordered[min(n - 1, int(p * n))] * 1000
+
+        return (
+            f"{self.name:<22} n={n:<6} {n / elapsed:9.1f}/s  "
+            f"p50={pct(0.50):7.1f}ms p95={pct(0.95):7.1f}ms p99={pct(0.99):7.1f}ms "
+            f"max={ordered[-1] * 1000:7.1f}ms mean={statistics.fmean(ordered) * 1000:6.1f}ms err={self.errors}"
+        )
@@ -0,0 +1,210 @@
+"""Offline benchmarks for the bot's handlers.
+
+Runs the real code in main.py against the fakes in bench/fakes.py and prints
+throughput and tail latency per operation:
+
+    python bench/run_bench.py                      # every scenario
+    python bench/run_bench.py queue parties --players 128 --parties 100
+
+Scenarios:
+  queue        N players join the queue VC, play, and rejoin for --rounds
+               rounds; times start_queue_match and each player's queue wait
+  parties      M parties go through invite/accept/list/promote/kick/leave/disband
+  leaderboard  concurrent /leaderboard pages while Elo keeps changing
+  claim        concurrent /claim with a fake Hypixel (see claim_load.py for
+               the run against the stand-in API server)
+
+Data files are written to a fresh temp directory, never the repo.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from harness import Recorder, add_pending, boot, load_main, make_guild, quiet, seed_players, shutdown
+from fakes import FakeInteraction, FakeStats, Latency
+
+SCENARIOS = ("queue", "parties", "leaderboard", "claim")
+
+
+async def bench_queue(main, guild, args):
+    members = seed_players(main, guild, args.players)
+    queue_vc = guild.get_channel(main.QUEUE_VC_ID)
+    state = main.guild_state(guild.id)
+    engine = next(e for e in state.queue_engines if e.queue_vc_id == main.QUEUE_VC_ID)
+    engine.debounce = args.debounce
+    state.lobbies.sync(guild)
+    engine.seed(queue_vc)
+    engine.start()
+
+    starts = Recorder("start_queue_match")
+    waits = Recorder("queue wait")
+    joined_at = {}
+    rounds_left = {m.id: args.rounds for m in members}
+    games = set()
+    original = engine.start_match
+
+    def join(member):
+        joined_at[member.id] = time.perf_counter()
+        guild.set_voice(member, queue_vc)
+
+    async def play(selected):
+        await asyncio.sleep(args.game)
+        for m in selected:
+            rounds_left[m.id] -= 1
+            if rounds_left[m.id] > 0:
+                join(m)
+            else:
+                guild.set_voice(m, None)
+
+    async def timed_start(g, selected, pair):
+        now = time.perf_counter()
+        for m in selected:
+            waits.add(now - joined_at.pop(m.id, now))
+        await starts.time(original(g, selected, pair))
+        task = asyncio.create_task(play(selected))
+        games.add(task)
+        task.add_done_callback(games.discard)
+
+    engine.start_match = timed_start
+    try:
+        for m in members:
+            join(m)
+            await asyncio.sleep(args.spread / len(members))
+        # done once nothing is in flight and too few players are left to match
+        while True:
+            await asyncio.sleep(max(args.debounce, 0.05) * 2)
+            if not games and not engine._matches and len(engine.waiting()) < engine.min_players:
+                break
+    finally:
+        engine.start_match = original
+    starts.stop()
+    waits.stop()
+    return [starts, waits]
+
+
+async def bench_parties(main, guild, args):
+    size = 4
+    members = seed_players(main, guild, args.parties * size, elo=False)
+    text = guild.get_channel(main.ALLOWED_TEXT_CHANNEL_ID)
+    commands = {name: Recorder(f"/party {name}") for name in
+                ("invite", "accept", "list", "promote", "kick", "leave", "disband")}
+
+    async def run(name, user, *extra):
+        inter = FakeInteraction(guild, user, text)
+        command = getattr(main, "list_members" if name == "list" else name)
+        await commands[name].time(command.callback(inter, *extra))
+
+    async def lifecycle(group):
+        leader, *rest = group
+        for m in rest:
+            await run("invite", leader, m)
+            await run("accept", m)
+        await run("list", random.choice(group))
+        await run("promote", leader, rest[0])
+        await run("kick", rest[0], rest[1])
+        await run("leave", rest[2])
+        await run("disband", rest[0])
+
+    groups = [members[i:i + size] for i in range(0, len(members), size)]
+    for _ in range(args.rounds):
+        await asyncio.gather(*(lifecycle(g) for g in groups))
+    for r in commands.values():
+        r.stop()
+    return list(commands.values())
+
+
+async def bench_leaderboard(main, guild, args):
+    members = seed_players(main, guild, args.players * 10)
+    text = guild.get_channel(main.ALLOWED_TEXT_CHANNEL_ID)
+    pages = Recorder("/leaderboard")
+    writes = Recorder("set_elo")
+    page_count = main.ranks.page_count()
+
+    async def reader():
+        for _ in range(args.requests // args.concurrency):
+            inter = FakeInteraction(guild, random.choice(members), text)
+            await pages.time(main.leaderboard.callback(inter, random.randint(1, page_count)))
+
+    async def writer():
+        for _ in range(args.requests // 10):
+            uid = str(random.choice(members).id)
+            start = time.perf_counter()
+            main.set_elo(uid, main.elo_data.get(uid, 0) + random.randint(-25, 25))
+            writes.add(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(writer(), *(reader() for _ in range(args.concurrency)))
+    pages.stop()
+    writes.stop()
+    return [pages, writes]
+
+
+async def bench_claim(main, guild, args):
+    members = seed_players(main, guild, args.players * 4)
+    text = guild.get_channel(main.ALLOWED_TEXT_CHANNEL_ID)
+    await add_pending(main, {str(m.id): [(110, 55, 15)] for m in members})
+    stats = FakeStats(Latency(args.upstream / 1000, args.upstream / 1000))
+    real, main.hypixel = main.hypixel, stats
+    claims = Recorder("/claim")
+    try:
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def claim(member):
+            async with sem:
+                await claims.time(main.claim.callback(FakeInteraction(guild, member, text)))
+
+        await asyncio.gather(*(claim(m) for m in members))
+    finally:
+        main.hypixel = real
+    claims.stop()
+    return [claims]
+
+
+async def run(scenarios, args):
+    random.seed(args.seed)
+    main = load_main()
+    guild = make_guild(main, Latency(args.latency / 1000, args.jitter / 1000))
+    with quiet(not args.verbose):
+        await boot(main)
+    results = []
+    try:
+        for name in scenarios:
+            with quiet(not args.verbose):
+                recorders = await globals()[f"bench_{name}"](main, guild, args)
+            results.append((name, recorders))
+            for r in recorders:
+                print(r.report())
+    finally:
+        with quiet(not args.verbose):
+            await shutdown(main)
+    print(f"discord calls: {guild.latency.calls}, store writes pending at exit: {main.store.pending_writes()}, "
+          f"channel messages: {main.dispatcher.messages_sent} carrying {main.dispatcher.lines_sent} lines")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--players", type=int, default=64, help="players in the queue scenario")
+    parser.add_argument("--parties", type=int, default=50, help="concurrent parties")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=2000, help="leaderboard requests")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=5.0, help="fake Discord latency (ms)")
+    parser.add_argument("--jitter", type=float, default=5.0, help="extra random latency (ms)")
+    parser.add_argument("--upstream", type=float, default=50.0, help="fake Hypixel latency (ms)")
+    parser.add_argument("--debounce", type=float, default=0.1, help="queue debounce (s)")
+    parser.add_argument("--game", type=float, default=0.2, help="length of a simulated game (s)")
+    parser.add_argument("--spread", type=float, default=1.0, help="seconds over which players join")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the bot's own output")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+    asyncio.run(run(args.scenarios or SCENARIOS, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Local stand-in for the Mojang and Hypixel APIs.
+
+Serves the three endpoints the bot calls, with the same payload shapes:
+
+    GET  /users/profiles/minecraft/{name}   Mojang name -> profile (204 if unknown)
+    POST /profiles/minecraft                Mojang bulk lookup (max 10 names)
+    GET  /player?uuid=...                   Hypixel player with Bedwars stats
+
+Names containing "unknown" do not exist.  Hypixel requests need an API-Key
+header, are counted against a fixed window and answered with RateLimit-Limit /
+-Remaining / -Reset headers (429 + Retry-After once the window is used up),
+like the real API.  Latency and a random 5xx error rate are configurable.
+
+Point the bot at it with
+
+    MOJANG_API_URL=http://127.0.0.1:8181 HYPIXEL_API_URL=http://127.0.0.1:8181
+
+or run it from claim_load.py, which starts one in-process.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+def player_uuid(name):
+    return hashlib.md5(f"OfflinePlayer:{name.lower()}".encode()).hexdigest()
+
+
+class Upstream:
+    def __init__(self, latency=0.08, jitter=0.04, error_rate=0.0, rate_limit=300, rate_period=300,
+                 kills=5000, finals=2000):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.kills = kills
+        self.finals = finals
+        self.requests = Counter()   # endpoint -> count
+        self.statuses = Counter()   # status -> count
+        self._windows = {}          # api key -> (window start, used)
+        self._runner = None
+
+    # === HELPERS ===
+    async def _delay(self):
+        delay = self.latency + random.random() * self.jitter
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _failed(self):
+        return self.error_rate and random.random() < self.error_rate
+
+    def _reply(self, status, data=None, headers=None):
+        self.statuses[status] += 1
+        if data is None:
+            return web.Response(status=status, headers=headers)
+        return web.json_response(data, status=status, headers=headers)
+
+    def _profile(self, name):
+        if "unknown" in name.lower():
+            return None
+        return {"id": player_uuid(name), "name": name}
+
+    def _stats(self, uuid):
+        # stable per player, so repeated lookups agree
+        offset = int(uuid[:4], 16) % 500
+        return self.kills + offset, self.finals + offset // 2
+
+    # === MOJANG ===
+    async def profile(self, request):
+        self.requests["mojang.profile"] += 1
+        await self._delay()
+        if self._failed():
+            return self._reply(503)
+        profile = self._profile(request.match_info["name"])
+        return self._reply(200, profile) if profile else self._reply(204)
+
+    async def profiles(self, request):
+        self.requests["mojang.profiles"] += 1
+        await self._delay()
+        if self._failed():
+            return self._reply(503)
+        names = await request.json()
+        if not isinstance(names, list) or len(names) > 10:
+            return self._reply(400, {"error": "IllegalArgumentException"})
+        return self._reply(200, [p for p in map(self._profile, names) if p])
+
+    # === HYPIXEL ===
+    def _rate_headers(self, key):
+        now = time.monotonic()
+        start, used = self._windows.get(key, (now, 0))
+        if now - start >= self.rate_period:
+            start, used = now, 0
+        allowed = used < self.rate_limit
+        if allowed:
+            used += 1
+        self._windows[key] = (start, used)
+        reset = max(1, int(self.rate_period - (now - start)))
+        headers = {
+            "RateLimit-Limit": str(self.rate_limit),
+            "RateLimit-Remaining": str(self.rate_limit - used),
+            "RateLimit-Reset": str(reset),
+        }
+        if not allowed:
+            headers["Retry-After"] = str(reset)
+        return allowed, headers
+
+    async def player(self, request):
+        self.requests["hypixel.player"] += 1
+        key = request.headers.get("API-Key")
+        if not key:
+            return self._reply(403, {"success": False, "cause": "Invalid API key"})
+        allowed, headers = self._rate_headers(key)
+        if not allowed:
+            return self._reply(429, {"success": False, "cause": "Key throttle", "throttle": True}, headers)
+        await self._delay()
+        if self._failed():
+            return self._reply(502, None, headers)
+        uuid = request.query.get("uuid", "")
+        kills, finals = self._stats(uuid or "0000")
+        data = {
+            "success": True,
+            "player": {
+                "uuid": uuid,
+                "stats": {"Bedwars": {"kills_bedwars": kills, "final_kills_bedwars": finals}},
+            },
+        }
+        return self._reply(200, data, headers)
+
+    # === SERVER ===
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/users/profiles/minecraft/{name}", self.profile)
+        app.router.add_post("/profiles/minecraft", self.profiles)
+        app.router.add_get("/player", self.player)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving; returns the base URL."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def add_arguments(parser):
+    parser.add_argument("--upstream-latency", type=float, default=80.0, help="upstream latency (ms)")
+    parser.add_argument("--upstream-jitter", type=float, default=40.0, help="extra random upstream latency (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream requests that fail with 5xx")
+    parser.add_argument("--rate-limit", type=int, default=300, help="Hypixel requests per window per key")
+    parser.add_argument("--rate-period", type=int, default=300, help="Hypixel rate-limit window (s)")
+
+
+def from_args(args):
+    return Upstream(
+        latency=args.upstream_latency / 1000,
+        jitter=args.upstream_jitter / 1000,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_period=args.rate_period,
+    )
+
+
+async def serve(args):
+    upstream = from_args(args)
+    url = await upstream.start(args.host, args.port)
+    print(f"Serving Mojang/Hypixel stand-in on {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await upstream.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8181)
+    add_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,115 @@
+"""Outgoing channel messages (the /p invites and other announcements).
+
+Each channel gets its own queue and worker.  Lines posted within ``window``
+seconds of each other are joined into as few messages as fit in Discord's
+2000-character limit, and each channel is paced to ``rate`` messages per
+``per`` seconds so a burst of match starts never runs into a 429.
+
+Lines posted with ``merge=False`` (the /p commands the game chat bridge runs
+one per message) are paced the same way but always sent on their own.
+
+``post`` returns a future that resolves to the sent message (or raises the
+send error); callers that don't care can ignore it, failures are printed.
+"""
+import asyncio
+import time
+from collections import deque
+
+MESSAGE_LIMIT = 2000
+
+
+class _ChannelQueue:
+    __slots__ = ("channel", "items", "sent_at", "task")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.items = deque()     # (text, future, merge)
+        self.sent_at = deque()   # send times inside the pacing window
+        self.task = None
+
+
+class Dispatcher:
+    def __init__(self, send=None, window=0.3, rate=5, per=5.0, limit=MESSAGE_LIMIT):
+        """send(channel, text) is awaited for every message (default channel.send)."""
+        self._send = send or (lambda channel, text: channel.send(text))
+        self.window = window
+        self.rate = rate
+        self.per = per
+        self.limit = limit
+        self._queues = {}   # channel id -> _ChannelQueue
+        self.messages_sent = 0
+        self.lines_sent = 0
+
+    def post(self, channel, text, merge=True):
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = _ChannelQueue(channel)
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume)
+        queue.items.append((text, future, merge))
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._run(queue))
+        return future
+
+    async def send(self, channel, text, merge=True):
+        return await self.post(channel, text, merge)
+
+    def pending(self):
+        return sum(len(q.items) for q in self._queues.values())
+
+    def _take_batch(self, queue):
+        lines, futures, size = [], [], 0
+        while queue.items:
+            text, future, merge = queue.items[0]
+            extra = len(text) + (1 if lines else 0)
+            if lines and (not merge or size + extra > self.limit):
+                break
+            queue.items.popleft()
+            lines.append(text)
+            futures.append(future)
+            size += extra
+            if not merge:
+                break
+        return "\n".join(lines), futures
+
+    async def _pace(self, queue):
+        while len(queue.sent_at) >= self.rate:
+            wait = queue.sent_at[0] + self.per - time.monotonic()
+            if wait <= 0:
+                queue.sent_at.popleft()
+            else:
+                await asyncio.sleep(wait)
+
+    async def _run(self, queue):
+        while queue.items:
+            if queue.items[0][2]:
+                # let the rest of a burst arrive before packing the message
+                await asyncio.sleep(self.window)
+            await self._pace(queue)
+            text, futures = self._take_batch(queue)
+            queue.sent_at.append(time.monotonic())
+            try:
+                message = await self._send(queue.channel, text)
+            except Exception as e:
+                print(f"❌ Failed to send to #{getattr(queue.channel, 'name', queue.channel.id)}: {e}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.messages_sent += 1
+            self.lines_sent += len(futures)
+            for future in futures:
+                if not future.done():
+                    future.set_result(message)
+
+    async def close(self, timeout=10):
+        """Wait (up to ``timeout`` seconds) for queued messages to go out."""
+        tasks = [q.task for q in self._queues.values() if q.task and not q.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+
+def _consume(future):
+    # failures are already printed; don't warn about unawaited results
+    if not future.cancelled():
+        future.exception()
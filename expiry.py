@@ -0,0 +1,75 @@
+"""Deadline scheduler for things that expire (idle parties, party invites).
+
+Deadlines sit in a min-heap and one task sleeps until the earliest of them,
+so the cost of a pass is the number of entries that are due rather than the
+number of parties.  Entries are checked lazily: when one comes due the
+handler decides whether the key really expired or returns a later deadline
+(e.g. the party was active in the meantime), which is pushed back on the heap.
+Activity therefore never has to touch the heap.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class ExpiryScheduler:
+    def __init__(self, handler):
+        """handler(key) -> None when the key is done, or a new deadline."""
+        self.handler = handler
+        self._heap = []
+        self._deadlines = {}   # key -> current deadline
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, key, deadline):
+        self._deadlines[key] = deadline
+        seq = next(self._seq)
+        heapq.heappush(self._heap, (deadline, seq, key))
+        if self._heap[0][1] == seq:
+            # new earliest deadline: the timer task has to sleep less
+            self._wake.set()
+
+    def cancel(self, key):
+        # the heap entry is skipped when it surfaces
+        self._deadlines.pop(key, None)
+
+    def _next_deadline(self):
+        while self._heap:
+            deadline, _, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def run_due(self, now=None):
+        now = now or time.time()
+        while (deadline := self._next_deadline()) is not None and deadline <= now:
+            _, _, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            try:
+                later = self.handler(key)
+            except Exception as e:
+                print(f"❌ Expiry handler failed for {key}: {e}")
+                later = None
+            if later is not None:
+                self.schedule(key, later)
+
+    async def run(self):
+        while True:
+            self._wake.clear()
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.run_due()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
@@ -0,0 +1,174 @@
+"""Per-guild configuration and state.
+
+GuildConfig holds the channel ids one server uses; it is stored in the
+store's ``guilds`` table keyed by guild id.  GuildState holds everything that
+belongs to one server: its config, parties and invites, the team VC pairs and
+queue engines, and the forcequeue VC pool.  Elo and account links stay global,
+so a player keeps their rating across servers.
+
+Parties are stored as ``"<guild id>:<leader id>"`` in the ``parties`` table.
+"""
+import asyncio
+
+from lobbies import LobbyAllocator
+from matchmaking import QueueEngine
+from parties import PartyRegistry
+from vcpool import TempVCPool
+
+
+class GuildConfig:
+    # field -> kind: "id" (one channel), "ids" (list of channels), "pairs"
+    FIELDS = {
+        "text_channel_id": "id",         # where /party invite may be used
+        "party_chat_channel_id": "id",   # /p invites for the game chat bridge
+        "party_queue_vc_id": "id",       # /party queue and forcequeue
+        "party_vc_ids": "ids",           # team VCs for /party queue (first two) and requeue
+        "match_queue_vc_ids": "ids",     # public matchmaking queues
+        "team_vc_pairs": "pairs",        # {capacity: [(red, green)]} shared by the queues
+        "temp_vc_category_id": "id",     # forcequeue red/green VCs
+    }
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, **fields):
+        for name, kind in self.FIELDS.items():
+            default = None if kind == "id" else ([] if kind == "ids" else {})
+            setattr(self, name, fields.get(name, default))
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data["team_vc_pairs"] = {str(cap): [list(p) for p in pairs] for cap, pairs in self.team_vc_pairs.items()}
+        return data
+
+    @staticmethod
+    def from_dict(data):
+        data = dict(data)
+        pairs = data.get("team_vc_pairs") or {}
+        data["team_vc_pairs"] = {int(cap): [tuple(p) for p in ps] for cap, ps in pairs.items()}
+        return GuildConfig(**{k: v for k, v in data.items() if k in GuildConfig.FIELDS})
+
+    def only(self, keep):
+        """Copy with only the channels ``keep(channel_id)`` accepts."""
+        fields = {}
+        for name, kind in self.FIELDS.items():
+            value = getattr(self, name)
+            if kind == "id":
+                fields[name] = value if value and keep(value) else None
+            elif kind == "ids":
+                fields[name] = [c for c in value if keep(c)]
+            else:
+                pairs = {cap: [p for p in ps if all(keep(c) for c in p)] for cap, ps in value.items()}
+                fields[name] = {cap: ps for cap, ps in pairs.items() if ps}
+        return GuildConfig(**fields)
+
+    @staticmethod
+    def parse(field, text):
+        """Parse an admin-entered value: "123", "1 2 3" or "8:1,2 6:3,4"."""
+        kind = GuildConfig.FIELDS.get(field)
+        if kind is None:
+            raise ValueError(f"Unknown field {field}. Fields: {', '.join(GuildConfig.FIELDS)}")
+        parts = text.replace(",", " ").split()
+        if kind == "id":
+            if len(parts) != 1:
+                raise ValueError(f"{field} takes one channel id.")
+            return int(parts[0])
+        if kind == "ids":
+            return [int(p) for p in parts]
+        pairs = {}
+        for entry in text.split():
+            cap, _, ids = entry.partition(":")
+            red, _, green = ids.partition(",")
+            pairs.setdefault(int(cap), []).append((int(red), int(green)))
+        return pairs
+
+
+class GuildState:
+    def __init__(self, guild_id, config, store, start_match, invite_expiration, on_party=None):
+        """start_match(guild, members, pair) is handed to the queue engines;
+        on_party(state, party) is called for every new or loaded party."""
+        self.guild_id = guild_id
+        self.guild = None   # set by start()
+        self.store = store
+        self._start_match = start_match
+        created = (lambda party: on_party(self, party)) if on_party else None
+        self.parties = PartyRegistry(
+            invite_expiration, save=self.save_party, drop=self.drop_party, created=created, removed=self._party_removed
+        )
+        self.config = None
+        self.lobbies = None
+        self.queue_engines = []
+        self.vc_pool = None
+        self.apply_config(config)
+
+    # === CONFIG ===
+    def apply_config(self, config):
+        """Switch to ``config``; parties are kept, queues and pools rebuilt."""
+        for engine in self.queue_engines:
+            engine.stop()
+        self.config = config
+        self.lobbies = LobbyAllocator(config.team_vc_pairs)
+        self.queue_engines = [QueueEngine(vc_id, self._start_match, self.lobbies) for vc_id in config.match_queue_vc_ids]
+        if self.vc_pool is None or self.vc_pool.category_id != config.temp_vc_category_id:
+            self.vc_pool = None
+            if config.temp_vc_category_id:
+                self.vc_pool = TempVCPool(config.temp_vc_category_id, released=self._vcs_released)
+                self._reserve_vcs()
+
+    def save_config(self):
+        self.store.set("guilds", str(self.guild_id), self.config.to_dict())
+
+    def start(self, guild):
+        """Sync the queues with the guild's voice channels and start them
+        (on ready and after reconnects)."""
+        self.guild = guild
+        self.lobbies.sync(guild)
+        for engine in self.queue_engines:
+            queue_vc = guild.get_channel(engine.queue_vc_id)
+            if queue_vc:
+                engine.seed(queue_vc)
+            engine.start()
+
+    def stop(self):
+        for engine in self.queue_engines:
+            engine.stop()
+
+    def on_voice_state_update(self, member, before, after):
+        self.lobbies.on_voice_state_update(member, before, after)
+        if self.vc_pool:
+            self.vc_pool.on_voice_state_update(member, before, after)
+        for engine in self.queue_engines:
+            engine.on_voice_state_update(member, before, after)
+
+    # === PARTIES ===
+    def party_key(self, leader_id):
+        return f"{self.guild_id}:{leader_id}"
+
+    def save_party(self, party):
+        self.store.set("parties", self.party_key(party.leader_id), party.to_dict())
+
+    def drop_party(self, leader_id):
+        self.store.delete("parties", self.party_key(leader_id))
+
+    def load_parties(self):
+        prefix = f"{self.guild_id}:"
+        self.parties.load(data for key, data in self.store.table("parties").items() if key.startswith(prefix))
+        self._reserve_vcs()
+
+    # === TEMP VCS ===
+    def _reserve_vcs(self):
+        # pairs saved parties still hold must not be adopted as idle by warm()
+        if self.vc_pool is None:
+            return
+        for party in self.parties.by_leader.values():
+            if party.temp_vcs:
+                self.vc_pool.reserve(party.temp_vcs, party)
+
+    def _vcs_released(self, party, pair):
+        if party is None or tuple(party.temp_vcs or ()) != pair:
+            return
+        party.temp_vcs = None
+        if self.parties.by_leader.get(party.leader_id) is party:
+            self.parties.save(party)
+
+    def _party_removed(self, party):
+        if party.temp_vcs and self.vc_pool and self.guild and self.vc_pool.owner(party.temp_vcs) is party:
+            asyncio.create_task(self.vc_pool.give_back(self.guild, party.temp_vcs))
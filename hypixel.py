@@ -0,0 +1,124 @@
+"""Hypixel Bedwars stats with caching, request coalescing and rate limiting.
+
+* Stats are cached per UUID for a short time, so a burst of /claim calls
+  after a game costs one request per player.
+* Concurrent lookups for the same UUID share one in-flight request.
+* Requests wait on a token bucket that follows Hypixel's ``RateLimit-*``
+  response headers, so busy nights queue requests instead of failing them.
+"""
+import asyncio
+import time
+
+import aiohttp
+
+HYPIXEL_API = "https://api.hypixel.net"
+
+
+class HypixelError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Token bucket synced to the RateLimit-Limit/-Remaining/-Reset headers."""
+
+    def __init__(self, capacity=300, period=300):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.reset_at = time.monotonic() + period
+        self._lock = asyncio.Lock()
+        self._refilled = asyncio.Event()
+
+    async def acquire(self):
+        # the lock makes waiters line up in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now >= self.reset_at:
+                    self.tokens = self.capacity
+                    self.reset_at = now + self.period
+                if self.tokens > 0:
+                    self.tokens -= 1
+                    return
+                # headers from a response still in flight may refill us earlier
+                self._refilled.clear()
+                try:
+                    await asyncio.wait_for(self._refilled.wait(), self.reset_at - now)
+                except asyncio.TimeoutError:
+                    pass
+
+    def update(self, headers):
+        try:
+            if "RateLimit-Limit" in headers:
+                limit = int(headers["RateLimit-Limit"])
+                if limit > self.capacity:
+                    # the key allows more than we assumed: the difference is
+                    # still available in this window
+                    self.tokens += limit - self.capacity
+                self.capacity = limit
+            if "RateLimit-Remaining" in headers:
+                self.tokens = min(self.tokens, int(headers["RateLimit-Remaining"]))
+            if "RateLimit-Reset" in headers:
+                self.reset_at = time.monotonic() + int(headers["RateLimit-Reset"])
+        except ValueError:
+            pass
+        if self.tokens > 0:
+            self._refilled.set()
+
+    def throttled(self, retry_after):
+        self.tokens = 0
+        self.reset_at = time.monotonic() + retry_after
+
+
+class HypixelClient:
+    def __init__(self, http, api_key=None, base_url=HYPIXEL_API, ttl=30, max_attempts=3):
+        self.http = http
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.limiter = RateLimiter()
+        self._cache = {}     # uuid -> (expires_at, (kills, finals))
+        self._inflight = {}  # uuid -> Task
+
+    async def bedwars_stats(self, uuid):
+        """Return (kills_bedwars, final_kills_bedwars) for a player."""
+        hit = self._cache.get(uuid)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+
+        task = self._inflight.get(uuid)
+        if task is None:
+            task = asyncio.create_task(self._fetch(uuid))
+            self._inflight[uuid] = task
+            task.add_done_callback(lambda _: self._inflight.pop(uuid, None))
+        # shield: one caller giving up must not cancel the others
+        return await asyncio.shield(task)
+
+    def forget(self, uuid):
+        self._cache.pop(uuid, None)
+
+    async def _fetch(self, uuid):
+        for _ in range(self.max_attempts):
+            await self.limiter.acquire()
+            try:
+                status, headers, data = await self.http.get_json(
+                    f"{self.base_url}/player", service="hypixel",
+                    params={"uuid": uuid}, headers={"API-Key": self.api_key or ""},
+                )
+            except (asyncio.TimeoutError, OSError, aiohttp.ClientError) as e:
+                raise HypixelError(str(e)) from e
+            self.limiter.update(headers)
+
+            if status == 429:
+                retry_after = headers.get("Retry-After") or headers.get("RateLimit-Reset") or 5
+                self.limiter.throttled(int(retry_after))
+                continue
+            if status != 200 or not data:
+                raise HypixelError(f"Hypixel returned HTTP {status}")
+
+            bedwars = ((data.get("player") or {}).get("stats") or {}).get("Bedwars", {})
+            stats = (bedwars.get("kills_bedwars", 0), bedwars.get("final_kills_bedwars", 0))
+            self._cache[uuid] = (time.monotonic() + self.ttl, stats)
+            return stats
+        raise HypixelError("Hypixel rate limit did not clear")
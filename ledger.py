@@ -0,0 +1,97 @@
+"""Pending Elo rewards, kept sorted by the stats they require.
+
+The game server appends rewards to pending_elo.json (the store's ``pending``
+table) as::
+
+    {"expected_kills": 1520, "expected_finals": 310, "elo_change": 25}
+
+``expected_*`` are the lifetime Bedwars counters the player must reach.  It
+may also write ``baseline_*`` (the counters when the reward was created) and
+``created_at``.
+
+A player's list is normalized once whenever it changes (sorted by
+(expected_kills, expected_finals), stamped with ``created_at`` and stripped of
+expired entries).  A claim then bisects for the entries the player's kills
+already cover instead of re-checking the whole list.  The normalized copy is
+kept in memory; the store is only written when entries are settled or expire,
+or when new entries get their ``created_at`` stamp.  The stamp has to be saved
+or a restart (or the next refresh of the file) would start their TTL over.
+"""
+import time
+from bisect import bisect_right
+
+PENDING_TTL = 7 * 24 * 3600
+
+
+def _threshold(entry):
+    return entry["expected_kills"], entry["expected_finals"]
+
+
+class PendingLedger:
+    def __init__(self, store, ttl=PENDING_TTL):
+        self.store = store
+        self.ttl = ttl
+        self._views = {}   # uid -> (stored list, its normalized copy)
+        self._oldest = {}  # uid -> oldest created_at in that copy
+
+    def _normalize_entry(self, entry, now):
+        entry = dict(entry)
+        if "expected_kills" not in entry:
+            entry["expected_kills"] = entry.get("baseline_kills", 0) + entry.pop("need_kills", 0)
+        if "expected_finals" not in entry:
+            entry["expected_finals"] = entry.get("baseline_finals", 0) + entry.pop("need_finals", 0)
+        entry.setdefault("elo_change", 0)
+        entry.setdefault("created_at", now)
+        return entry
+
+    def entries(self, uid, now=None):
+        """The player's entries, sorted by threshold with expired ones removed."""
+        now = now or time.time()
+        stored = self.store.get("pending", uid) or []
+        view = self._views.get(uid)
+        if view is not None and view[0] is stored:
+            entries = view[1]
+            if self._oldest[uid] >= now - self.ttl:
+                return entries
+            stamped = False
+        else:
+            stamped = any("created_at" not in e for e in stored)
+            entries = sorted((self._normalize_entry(e, now) for e in stored), key=_threshold)
+        fresh = [e for e in entries if e["created_at"] >= now - self.ttl]
+        if stamped or len(fresh) != len(entries):
+            self._save(uid, fresh)
+        else:
+            self._remember(uid, stored, entries)
+        return fresh
+
+    def _remember(self, uid, stored, entries):
+        if entries:
+            self._views[uid] = (stored, entries)
+            self._oldest[uid] = min(e["created_at"] for e in entries)
+        else:
+            self._views.pop(uid, None)
+            self._oldest.pop(uid, None)
+
+    def _save(self, uid, entries):
+        if entries:
+            self.store.set("pending", uid, entries)
+        else:
+            self.store.delete("pending", uid)
+        self._remember(uid, entries, entries)
+
+    def settle(self, uid, kills, finals, now=None):
+        """Remove the entries the player's stats satisfy; return the Elo they grant."""
+        entries = self.entries(uid, now)
+        cut = bisect_right(entries, kills, key=lambda e: e["expected_kills"])
+        if not cut:
+            return 0
+        reward_elo = 0
+        kept = []
+        for entry in entries[:cut]:
+            if finals >= entry["expected_finals"]:
+                reward_elo += entry["elo_change"]
+            else:
+                kept.append(entry)
+        if len(kept) != cut:
+            self._save(uid, kept + entries[cut:])
+        return reward_elo
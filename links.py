@@ -0,0 +1,65 @@
+"""Linked-account lookups kept entirely in memory.
+
+``by_discord`` is the store's ``links`` table itself.  Entries are
+``{"name": <minecraft name>, "uuid": <uuid or None>}``; older files stored the
+bare name as a string, which is still accepted.  ``by_name`` is the reverse
+index keyed by lower-cased Minecraft name.  Both are updated together by
+``link``/``unlink``; call ``rebuild`` after the store loads.
+"""
+
+
+def entry_name(entry):
+    return entry if isinstance(entry, str) else entry["name"]
+
+
+def entry_uuid(entry):
+    return None if isinstance(entry, str) else entry.get("uuid")
+
+
+class LinkIndex:
+    def __init__(self, store):
+        self.store = store
+        self.by_discord = store.table("links")
+        self.by_name = {}
+
+    def rebuild(self):
+        self.by_name = {entry_name(entry).lower(): uid for uid, entry in self.by_discord.items()}
+
+    def is_linked(self, uid):
+        return uid in self.by_discord
+
+    def name_of(self, uid):
+        entry = self.by_discord.get(uid)
+        return None if entry is None else entry_name(entry)
+
+    def uuid_of(self, uid):
+        entry = self.by_discord.get(uid)
+        return None if entry is None else entry_uuid(entry)
+
+    def owner_of(self, minecraft_name):
+        return self.by_name.get(minecraft_name.lower())
+
+    def missing_uuids(self):
+        """(uid, name) for every link that has not been resolved to a UUID yet."""
+        return [(uid, entry_name(e)) for uid, e in self.by_discord.items() if not entry_uuid(e)]
+
+    def link(self, uid, minecraft_name, uuid=None):
+        old = self.name_of(uid)
+        if old is not None and self.by_name.get(old.lower()) == uid:
+            del self.by_name[old.lower()]
+        self.store.set("links", uid, {"name": minecraft_name, "uuid": uuid})
+        self.by_name[minecraft_name.lower()] = uid
+
+    def set_uuid(self, uid, uuid, name=None):
+        # name is the canonical spelling from Mojang, if we got one
+        if uid in self.by_discord:
+            self.link(uid, name or self.name_of(uid), uuid)
+
+    def unlink(self, uid):
+        name = self.name_of(uid)
+        if name is None:
+            return None
+        self.store.delete("links", uid)
+        if self.by_name.get(name.lower()) == uid:
+            del self.by_name[name.lower()]
+        return name
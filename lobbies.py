@@ -0,0 +1,68 @@
+"""Pool of team voice-channel pairs shared by the queue engines.
+
+Each pair has a capacity (8 for a 4v4 pair, 6 for a 3v3 pair).  A queue
+engine leases a free pair for every match it forms and the pair comes back
+once both of its channels are empty again.  A pair someone joins without a
+lease (e.g. a party moved there by /party queue) is busy too until it empties.  Engines register a wake-up
+callback so they can form the next match as soon as a pair is released.
+"""
+
+
+class LobbyAllocator:
+    def __init__(self, pairs):
+        """pairs: {capacity: [(red_vc_id, green_vc_id), ...]}"""
+        self.capacity = {pair: cap for cap, cap_pairs in pairs.items() for pair in cap_pairs}
+        self.free = [pair for cap in sorted(pairs, reverse=True) for pair in pairs[cap]]
+        self.busy = set()
+        self._channel_pair = {vc_id: pair for pair in self.capacity for vc_id in pair}
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def sync(self, guild):
+        """Mark pairs that still have players in them as busy (on startup)."""
+        for pair in list(self.capacity):
+            channels = [guild.get_channel(vc_id) for vc_id in pair]
+            if any(vc and vc.members for vc in channels):
+                self._lease(pair)
+            else:
+                self.release(pair)
+
+    def acquire(self, max_players):
+        """Lease the largest free pair that holds at most ``max_players``.
+        Returns (pair, capacity) or None."""
+        best = None
+        for pair in self.free:
+            cap = self.capacity[pair]
+            if cap <= max_players and (best is None or cap > self.capacity[best]):
+                best = pair
+        if best is None:
+            return None
+        self._lease(best)
+        return best, self.capacity[best]
+
+    def _lease(self, pair):
+        if pair in self.free:
+            self.free.remove(pair)
+        self.busy.add(pair)
+
+    def release(self, pair):
+        if pair not in self.busy:
+            return
+        self.busy.discard(pair)
+        self.free.append(pair)
+        for callback in self._listeners:
+            callback()
+
+    def on_voice_state_update(self, member, before, after):
+        if after.channel is not None and (pair := self._channel_pair.get(after.channel.id)) in self.free:
+            self._lease(pair)
+        if before.channel is None or (after.channel is not None and after.channel.id == before.channel.id):
+            return
+        pair = self._channel_pair.get(before.channel.id)
+        if pair is None or pair not in self.busy:
+            return
+        guild = before.channel.guild
+        if all(not (vc := guild.get_channel(vc_id)) or not vc.members for vc_id in pair):
+            self.release(pair)
@@ -0,0 +1,139 @@
+"""Event-driven match forming for the queue voice channels.
+
+Each queue VC has its own QueueEngine.  Voice events are pushed onto a queue
+(never dropped) and consumed by one task per engine.  The task keeps the set
+of members waiting in the queue VC and a single debounce deadline: every join
+or leave pushes the deadline back, and once the channel has been quiet for
+``debounce`` seconds it forms as many matches as the LobbyAllocator has free
+team VC pairs.  Matches are started as their own tasks, so the next match can
+form while the previous one is still being moved.
+"""
+import asyncio
+import random
+
+IDLE = "idle"
+COUNTDOWN = "countdown"
+
+
+def match_size(count):
+    # 6-7 waiting players make a 3v3, 8+ make a 4v4
+    return 6 if count < 8 else 8
+
+
+class QueueEngine:
+    def __init__(self, queue_vc_id, start_match, lobbies, debounce=5, min_players=6):
+        """start_match(guild, members, pair) is awaited in its own task and
+        must release the pair if nobody could be moved into it."""
+        self.queue_vc_id = queue_vc_id
+        self.start_match = start_match
+        self.lobbies = lobbies
+        lobbies.add_listener(self.wake)
+        self.debounce = debounce
+        self.min_players = min_players
+        self.guild = None
+        self.members = set()   # ids currently in the queue VC
+        self.moving = set()    # ids handed to a match that is still starting
+        self.state = IDLE
+        self._events = asyncio.Queue()
+        self._task = None
+        self._matches = set()
+
+    # === INPUT ===
+    def seed(self, channel):
+        """Take the current occupants of the queue VC (on startup)."""
+        self.guild = channel.guild
+        self._events.put_nowait(("seed", {m.id for m in channel.members}))
+
+    def on_voice_state_update(self, member, before, after):
+        was_in = before.channel is not None and before.channel.id == self.queue_vc_id
+        now_in = after.channel is not None and after.channel.id == self.queue_vc_id
+        if was_in != now_in:
+            self.guild = member.guild
+            self._events.put_nowait(("join" if now_in else "leave", member.id))
+
+    def wake(self):
+        # a team VC pair was released
+        self._events.put_nowait(("settled", None))
+
+    def waiting(self):
+        return self.members - self.moving
+
+    # === LOOP ===
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        # matches already being moved finish on their own
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                kind, payload = await asyncio.wait_for(self._events.get(), timeout)
+            except asyncio.TimeoutError:
+                deadline = None
+                self._form_match()
+                changed = True
+            else:
+                changed = self._apply(kind, payload)
+
+            if len(self.waiting()) < self.min_players:
+                deadline = None
+            elif changed or deadline is None:
+                deadline = loop.time() + self.debounce
+            self.state = IDLE if deadline is None else COUNTDOWN
+
+    def _apply(self, kind, payload):
+        if kind == "seed":
+            self.members = set(payload)
+            return True
+        if kind == "join":
+            self.members.add(payload)
+            return True
+        if kind == "settled":
+            # only starts a countdown if none is running
+            return False
+        self.members.discard(payload)
+        # players we just moved out are expected to leave; don't restart the countdown
+        return payload not in self.moving
+
+    def _form_match(self):
+        if self.guild is None:
+            return
+        candidates = []
+        for mid in self.waiting():
+            member = self.guild.get_member(mid)
+            if member and member.voice and member.voice.channel and member.voice.channel.id == self.queue_vc_id:
+                candidates.append(member)
+            else:
+                self.members.discard(mid)
+
+        while len(candidates) >= self.min_players:
+            lease = self.lobbies.acquire(match_size(len(candidates)))
+            if lease is None:
+                return  # wait for a pair to be released
+            pair, capacity = lease
+            selected = random.sample(candidates, capacity)
+            ids = {m.id for m in selected}
+            candidates = [m for m in candidates if m.id not in ids]
+            self.moving |= ids
+            task = asyncio.create_task(self._run_match(selected, ids, pair))
+            self._matches.add(task)
+            task.add_done_callback(self._matches.discard)
+
+    async def _run_match(self, selected, ids, pair):
+        try:
+            await self.start_match(self.guild, selected, pair)
+        except Exception as e:
+            print(f"❌ Failed to start match: {e}")
+            self.lobbies.release(pair)
+        finally:
+            self.moving -= ids
+            # anyone whose move failed is still waiting
+            self._events.put_nowait(("settled", None))
@@ -0,0 +1,196 @@
+"""Counters and latency histograms for the bot.
+
+Everything records into the module-level REGISTRY:
+
+    with metrics.timer("storage_write", table="elo"):
+        ...
+
+records ``storage_write_seconds`` and, if the block raises, bumps
+``storage_write_errors_total``.  ``timer`` works with ``async with`` too.
+The registry is read by the admin ``/stats`` command and served in the
+Prometheus text format by MetricsServer (bound to localhost).
+"""
+import time
+from bisect import bisect_left
+
+from aiohttp import web
+
+# upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Timer:
+    __slots__ = ("registry", "name", "labels", "started")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(f"{self.name}_seconds", time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(f"{self.name}_errors_total", **self.labels)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}    # name -> {label key: value}
+        self.histograms = {}  # name -> {label key: Histogram}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = _key(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram()
+        hist.observe(value)
+
+    def timer(self, name, **labels):
+        return Timer(self, name, labels)
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+        self.started = time.time()
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for name in sorted(self.counters):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(self.counters[name].items()):
+                lines.append(f"{name}{_labels(key)} {value}")
+        for name in sorted(self.histograms):
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(self.histograms[name].items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(key, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(key, [('le', '+Inf')])} {hist.count}")
+                lines.append(f"{name}_sum{_labels(key)} {hist.total}")
+                lines.append(f"{name}_count{_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """[(series, count, errors, avg, p50, p95, max)] for every timer,
+        busiest first; times are in seconds."""
+        rows = []
+        for name, series in self.histograms.items():
+            base = name[:-len("_seconds")] if name.endswith("_seconds") else name
+            errors = self.counters.get(f"{base}_errors_total", {})
+            for key, hist in series.items():
+                label = ",".join(v for _, v in key)
+                rows.append((
+                    f"{base}[{label}]" if label else base,
+                    hist.count,
+                    errors.get(key, 0),
+                    hist.total / hist.count if hist.count else 0.0,
+                    hist.quantile(0.5),
+                    hist.quantile(0.95),
+                    hist.max,
+                ))
+        rows.sort(key=lambda r: -r[1])
+        return rows
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+
+class MetricsServer:
+    """Serves GET /metrics for a Prometheus scraper."""
+
+    def __init__(self, registry=REGISTRY, host="127.0.0.1", port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def _metrics(self, request):
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError:
+            await self._runner.cleanup()
+            self._runner = None
+            raise
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,97 @@
+"""Minecraft name -> UUID resolution through the Mojang API.
+
+Names are cached (including "no such player") for ``ttl`` seconds so that a
+rename is picked up eventually without asking Mojang on every lookup.  Bulk
+lookups go through the profiles endpoint, 10 names per request.
+"""
+import asyncio
+import time
+
+import aiohttp
+
+MOJANG_API = "https://api.mojang.com"
+BULK_LIMIT = 10
+
+
+class MojangError(Exception):
+    pass
+
+
+def _no_such_player(status):
+    # Mojang answers 204/404 for unknown names and 400 for names that can't
+    # exist (too long, bad characters); 429 means slow down, not "unknown"
+    return status == 204 or (400 <= status < 500 and status != 429)
+
+
+class MojangResolver:
+    def __init__(self, http, base_url=MOJANG_API, ttl=6 * 3600, negative_ttl=600):
+        self.http = http
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = {}  # name.lower() -> (expires_at, (name, uuid) or None)
+
+    def _cached(self, name):
+        hit = self._cache.get(name.lower())
+        if hit and hit[0] > time.monotonic():
+            return hit
+        return None
+
+    def _remember(self, name, profile):
+        ttl = self.ttl if profile else self.negative_ttl
+        self._cache[name.lower()] = (time.monotonic() + ttl, profile)
+
+    async def resolve(self, name):
+        """Return (canonical name, uuid), or None when no such player exists.
+        Raises MojangError when Mojang cannot be reached."""
+        hit = self._cached(name)
+        if hit:
+            return hit[1]
+        try:
+            status, _, data = await self.http.get_json(f"{self.base_url}/users/profiles/minecraft/{name}", service="mojang")
+        except (asyncio.TimeoutError, OSError, aiohttp.ClientError) as e:
+            raise MojangError(str(e)) from e
+        if _no_such_player(status):
+            profile = None
+        elif status == 200 and data and "id" in data:
+            profile = (data.get("name", name), data["id"])
+        else:
+            raise MojangError(f"Mojang returned HTTP {status}")
+        self._remember(name, profile)
+        return profile
+
+    async def resolve_many(self, names):
+        """Resolve up to ``BULK_LIMIT`` names in one request.  Returns a dict
+        keyed by lower-cased name; unknown names map to None."""
+        result = {}
+        missing = []
+        for name in names:
+            hit = self._cached(name)
+            if hit:
+                result[name.lower()] = hit[1]
+            else:
+                missing.append(name)
+        if not missing:
+            return result
+        if len(missing) > BULK_LIMIT:
+            raise ValueError(f"at most {BULK_LIMIT} names per bulk lookup")
+
+        try:
+            status, _, data = await self.http.post_json(f"{self.base_url}/profiles/minecraft", service="mojang", json=missing)
+        except (asyncio.TimeoutError, OSError, aiohttp.ClientError) as e:
+            raise MojangError(str(e)) from e
+        if _no_such_player(status):
+            # one bad name fails the whole batch: ask for each name on its
+            # own so only that one ends up unknown
+            for name in missing:
+                result[name.lower()] = await self.resolve(name)
+            return result
+        if status != 200 or not isinstance(data, list):
+            raise MojangError(f"Mojang returned HTTP {status}")
+
+        found = {p["name"].lower(): (p["name"], p["id"]) for p in data if "id" in p and "name" in p}
+        for name in missing:
+            profile = found.get(name.lower())
+            self._remember(name, profile)
+            result[name.lower()] = profile
+        return result
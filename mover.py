@@ -0,0 +1,53 @@
+"""Concurrent voice moves.
+
+Moving a match used to be a serial ``await member.move_to(...)`` loop.  The
+scheduler runs up to ``concurrency`` moves at once; discord.py's HTTP client
+still queues each request on its rate-limit bucket, so the bound only keeps
+us from flooding that bucket.  Transient failures (5xx, timeouts, a stray 429)
+are retried with backoff, and every move reports a MoveResult.
+"""
+import asyncio
+from collections import namedtuple
+
+import aiohttp
+import discord
+
+import metrics
+
+MoveResult = namedtuple("MoveResult", "member channel ok error")
+
+
+class MoveScheduler:
+    def __init__(self, concurrency=5, attempts=3, base_delay=0.5):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def move(self, member, channel):
+        error = None
+        for attempt in range(self.attempts):
+            async with self._slots:
+                try:
+                    with metrics.timer("discord_request", op="move"):
+                        await member.move_to(channel)
+                    return MoveResult(member, channel, True, None)
+                except (discord.Forbidden, discord.NotFound) as e:
+                    return MoveResult(member, channel, False, e)
+                except discord.HTTPException as e:
+                    # 400 means the member is no longer in voice; nothing to retry
+                    if e.status < 500 and e.status != 429:
+                        return MoveResult(member, channel, False, e)
+                    error = e
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = e
+            retry_after = getattr(error, "retry_after", None)
+            await asyncio.sleep(retry_after or self.base_delay * 2 ** attempt)
+        return MoveResult(member, channel, False, error)
+
+    async def move_many(self, moves):
+        """Move every (member, channel) pair; results come back in the same order."""
+        results = await asyncio.gather(*(self.move(m, c) for m, c in moves))
+        for r in results:
+            if not r.ok:
+                print(f"Error moving {r.member.display_name}: {r.error}")
+        return results
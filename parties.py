@@ -0,0 +1,196 @@
+"""Party state: slotted Party objects and the registry that indexes them.
+
+The registry keeps two indexes, member id -> party and leader id -> party, plus
+the pending invites, and exposes each party operation (invite, accept, leave,
+kick, promote, disband) as one method that updates every index together.
+Operations that the user is not allowed to do raise PartyError with the
+message to show them.  Persistence is left to the ``save``/``drop`` callbacks.
+"""
+import time
+
+
+class PartyError(Exception):
+    pass
+
+
+class Party:
+    __slots__ = ("leader_id", "members", "queued", "last_activity", "temp_vcs")
+
+    def __init__(self, leader_id, members=(), queued=False, last_activity=None, temp_vcs=None):
+        self.leader_id = leader_id
+        self.members = {leader_id, *members}
+        self.queued = queued
+        self.last_activity = time.time() if last_activity is None else last_activity
+        self.temp_vcs = temp_vcs  # [red_vc_id, green_vc_id] leased by forcequeue
+
+    def update_activity(self):
+        self.last_activity = time.time()
+
+    def ordered_members(self):
+        return [self.leader_id] + sorted(self.members - {self.leader_id})
+
+    def to_dict(self):
+        data = {
+            "leader_id": self.leader_id,
+            "members": self.ordered_members(),
+            "queued": self.queued,
+            "last_activity": self.last_activity
+        }
+        if self.temp_vcs:
+            data["temp_vcs"] = list(self.temp_vcs)
+        return data
+
+    @staticmethod
+    def from_dict(data):
+        return Party(
+            data["leader_id"],
+            members=data["members"],
+            queued=data["queued"],
+            last_activity=data["last_activity"],
+            temp_vcs=data.get("temp_vcs"),
+        )
+
+
+class PartyRegistry:
+    def __init__(self, invite_expiration, save=None, drop=None, created=None, removed=None):
+        """save(party) / drop(leader_id) persist changes; created(party) is
+        called for every new or loaded party (e.g. to schedule its expiry),
+        removed(party) when one is disbanded or expires."""
+        self.invite_expiration = invite_expiration
+        self._save = save or (lambda party: None)
+        self._drop = drop or (lambda leader_id: None)
+        self._created = created or (lambda party: None)
+        self._removed = removed or (lambda party: None)
+        self.by_member = {}   # member id -> Party
+        self.by_leader = {}   # leader id -> Party
+        self.invites = {}     # invitee id -> (inviter id, timestamp)
+
+    # === LOOKUPS ===
+    def __len__(self):
+        return len(self.by_leader)
+
+    def get(self, uid):
+        return self.by_member.get(uid)
+
+    def is_in_party(self, uid):
+        return uid in self.by_member
+
+    def is_leader(self, uid):
+        return uid in self.by_leader
+
+    def led_by(self, uid):
+        party = self.by_leader.get(uid)
+        if party is None:
+            raise PartyError("You are not the leader of a party.")
+        return party
+
+    # === LOADING ===
+    def load(self, records):
+        self.by_member.clear()
+        self.by_leader.clear()
+        for data in records:
+            party = Party.from_dict(data)
+            self._register(party)
+
+    def _register(self, party):
+        self.by_leader[party.leader_id] = party
+        for m in party.members:
+            self.by_member[m] = party
+        self._created(party)
+
+    def save(self, party):
+        self._save(party)
+
+    # === OPERATIONS ===
+    def invite(self, inviter, invitee, now=None):
+        if inviter == invitee:
+            raise PartyError("You can't invite yourself.")
+        if invitee in self.by_member:
+            raise PartyError("That user is already in a party.")
+        if invitee in self.invites:
+            raise PartyError("That user already has a pending invite.")
+        party = self.by_member.get(inviter)
+        if party is None:
+            party = Party(inviter)
+            self._register(party)
+        elif party.leader_id != inviter:
+            raise PartyError("Only the party leader can invite.")
+        self.invites[invitee] = (inviter, now or time.time())
+        return party
+
+    def decline(self, invitee):
+        return self.invites.pop(invitee, None)
+
+    def accept(self, invitee, now=None):
+        invite = self.invites.pop(invitee, None)
+        if invite is None:
+            raise PartyError("You have no pending invites.")
+        inviter, sent = invite
+        if (now or time.time()) - sent > self.invite_expiration:
+            raise PartyError("Invite expired.")
+        if invitee in self.by_member:
+            raise PartyError("You are already in a party.")
+        party = self.by_leader.get(inviter)
+        if party is None:
+            raise PartyError("Party no longer exists.")
+        party.members.add(invitee)
+        self.by_member[invitee] = party
+        party.update_activity()
+        self._save(party)
+        return party
+
+    def leave(self, uid):
+        """Returns True if the leader left and the party was disbanded."""
+        party = self.by_member.get(uid)
+        if party is None:
+            raise PartyError("You are not in a party.")
+        if party.leader_id == uid:
+            self.remove(party)
+            return True
+        party.members.discard(uid)
+        del self.by_member[uid]
+        self._save(party)
+        return False
+
+    def kick(self, leader, target):
+        party = self.by_leader.get(leader)
+        if party is None:
+            raise PartyError("Only the leader can kick members.")
+        if target not in party.members:
+            raise PartyError("That user is not in your party.")
+        if target == leader:
+            raise PartyError("You can't kick yourself.")
+        party.members.discard(target)
+        del self.by_member[target]
+        self._save(party)
+        return party
+
+    def promote(self, leader, target):
+        party = self.by_leader.get(leader)
+        if party is None:
+            raise PartyError("Only the leader can promote.")
+        if target not in party.members:
+            raise PartyError("That user is not in your party.")
+        del self.by_leader[leader]
+        self._drop(leader)
+        party.leader_id = target
+        self.by_leader[target] = party
+        self._save(party)
+        return party
+
+    def disband(self, leader):
+        party = self.by_leader.get(leader)
+        if party is None:
+            raise PartyError("Only the leader can disband the party.")
+        self.remove(party)
+        return party
+
+    def remove(self, party):
+        if self.by_leader.get(party.leader_id) is not party:
+            return
+        del self.by_leader[party.leader_id]
+        for m in party.members:
+            if self.by_member.get(m) is party:
+                del self.by_member[m]
+        self._drop(party.leader_id)
+        self._removed(party)
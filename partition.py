@@ -0,0 +1,164 @@
+"""Split players into two Elo-balanced teams.
+
+Players that must stay together (a party) are treated as one unit.  Up to
+``EXACT_LIMIT`` units the best split is found exactly with a meet-in-the-middle
+search over subsets; above that a greedy split improved by pairwise swaps is
+used.  Nothing runs past ``deadline`` seconds: an exact search that runs out
+of time falls back to the greedy split, and the swap phase stops where it is,
+so balancing never holds up a match.
+"""
+import random
+import time
+from bisect import bisect_left
+
+EXACT_LIMIT = 24
+DEFAULT_DEADLINE = 0.05
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def _units(players, together):
+    index = {p: i for i, p in enumerate(players)}
+    team_size = len(players) // 2
+    seen = set()
+    units = []
+    for group in together:
+        members = [p for p in group if p in index and p not in seen]
+        # a group that cannot fit in one team is split up
+        if 1 < len(members) <= team_size:
+            seen.update(members)
+            units.append(members)
+    units.extend([p] for p in players if p not in seen)
+    return units
+
+
+def _subsets(units, weights, check):
+    """All subsets of ``units`` as {size: sorted [(weight, mask)]}."""
+    by_size = {}
+    n = len(units)
+    for mask in range(1 << n):
+        if not mask & 0x3FF:
+            check()
+        size = weight = 0
+        for i in range(n):
+            if mask >> i & 1:
+                size += len(units[i])
+                weight += weights[i]
+        by_size.setdefault(size, []).append((weight, mask))
+    for entries in by_size.values():
+        entries.sort()
+    return by_size
+
+
+def _exact(units, weights, team_size, total, check):
+    half = len(units) // 2
+    left_units, right_units = units[:half], units[half:]
+    left = _subsets(left_units, weights[:half], check)
+    right = _subsets(right_units, weights[half:], check)
+
+    best = None
+    for size, entries in left.items():
+        options = right.get(team_size - size)
+        if not options:
+            continue
+        keys = [w for w, _ in options]
+        for weight, lmask in entries:
+            check()
+            want = total / 2 - weight
+            i = bisect_left(keys, want)
+            for j in (i - 1, i):
+                if 0 <= j < len(options):
+                    diff = abs(total - 2 * (weight + options[j][0]))
+                    if best is None or diff < best[0]:
+                        best = (diff, lmask, options[j][1])
+        if best and best[0] == 0:
+            break
+    if best is None:
+        return None
+    _, lmask, rmask = best
+    chosen = [u for i, u in enumerate(left_units) if lmask >> i & 1]
+    chosen += [u for i, u in enumerate(right_units) if rmask >> i & 1]
+    return chosen
+
+
+def _greedy(units, weights, team_size, player_count, check):
+    # heaviest unit first, onto the lighter team that still has room
+    order = sorted(range(len(units)), key=lambda i: -weights[i])
+    team_a, team_b = [], []
+    size_a = size_b = sum_a = sum_b = 0
+    for i in order:
+        n = len(units[i])
+        fits_a = size_a + n <= team_size
+        fits_b = size_b + n <= player_count - team_size
+        if fits_a and (sum_a <= sum_b or not fits_b):
+            team_a.append(i)
+            size_a += n
+            sum_a += weights[i]
+        else:
+            team_b.append(i)
+            size_b += n
+            sum_b += weights[i]
+    if size_a != team_size:
+        return None
+
+    # swap same-sized units while it narrows the gap
+    try:
+        improved = True
+        while improved:
+            improved = False
+            for ai, a in enumerate(team_a):
+                for bi, b in enumerate(team_b):
+                    check()
+                    if len(units[a]) != len(units[b]):
+                        continue
+                    delta = weights[b] - weights[a]
+                    if abs(sum_a - sum_b + 2 * delta) < abs(sum_a - sum_b):
+                        team_a[ai], team_b[bi] = b, a
+                        sum_a += delta
+                        sum_b -= delta
+                        improved = True
+                        break
+                if improved:
+                    break
+    except _OutOfTime:
+        pass
+    return [units[i] for i in team_a]
+
+
+def balance_teams(players, rating, together=(), deadline=DEFAULT_DEADLINE):
+    """Return (team_a, team_b) with len(team_a) == len(players) // 2.
+
+    ``rating(player)`` gives a player's Elo; ``together`` lists groups of
+    players to keep on the same team where possible.
+    """
+    players = list(players)
+    random.shuffle(players)  # ties between equal splits fall randomly
+    team_size = len(players) // 2
+    stop_at = time.perf_counter() + deadline
+
+    def check():
+        if time.perf_counter() > stop_at:
+            raise _OutOfTime
+
+    for groups in (together, ()):
+        units = _units(players, groups)
+        weights = [sum(rating(p) for p in u) for u in units]
+        total = sum(weights)
+        chosen = None
+        if len(units) <= EXACT_LIMIT:
+            try:
+                chosen = _exact(units, weights, team_size, total, check)
+            except _OutOfTime:
+                # the greedy pass is cheap; its swap phase stops at the deadline
+                chosen = _greedy(units, weights, team_size, len(players), check)
+        else:
+            chosen = _greedy(units, weights, team_size, len(players), check)
+        if chosen is not None:
+            team_a = [p for u in chosen for p in u]
+            picked = set(team_a)
+            return team_a, [p for p in players if p not in picked]
+
+    # the groups cannot be placed and neither can singles: plain split
+    return players[:team_size], players[team_size:]
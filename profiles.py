@@ -0,0 +1,90 @@
+"""Discord id -> display name lookups for messages and embeds.
+
+Guild members come straight from the gateway cache.  Anyone else (players
+who left the guild) costs a ``fetch_user`` REST call, so those results are
+kept in an LRU cache with a TTL, unknown ids included (for a shorter time).
+Misses are fetched concurrently, at most ``concurrency`` at a time, and
+concurrent lookups of the same id share one request.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class ProfileResolver:
+    def __init__(self, client, max_size=2048, ttl=600, negative_ttl=300, concurrency=4):
+        self.client = client
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = OrderedDict()   # user id -> (expires_at, name or None)
+        self._inflight = {}           # user id -> Task
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _cached(self, uid):
+        hit = self._cache.get(uid)
+        if hit is None:
+            return None
+        if hit[0] <= time.monotonic():
+            del self._cache[uid]
+            return None
+        self._cache.move_to_end(uid)
+        return hit
+
+    def _remember(self, uid, name):
+        ttl = self.ttl if name is not None else self.negative_ttl
+        self._cache[uid] = (time.monotonic() + ttl, name)
+        self._cache.move_to_end(uid)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def cached_name(self, guild, uid):
+        """Name without any REST call, or None if it is not known yet."""
+        member = guild.get_member(uid) if guild is not None else None
+        if member is not None:
+            return member.display_name
+        hit = self._cached(uid)
+        return hit[1] if hit else None
+
+    async def _fetch(self, uid):
+        async with self._slots:
+            try:
+                user = await self.client.fetch_user(uid)
+            except discord.NotFound:
+                self._remember(uid, None)
+                return None
+            except discord.HTTPException as e:
+                # not cached: the next lookup tries again
+                print(f"❌ Failed to fetch user {uid}: {e}")
+                return None
+        self._remember(uid, user.display_name)
+        return user.display_name
+
+    async def display_name(self, guild, uid):
+        """Member or user display name, or None for ids Discord does not know."""
+        member = guild.get_member(uid) if guild is not None else None
+        if member is not None:
+            return member.display_name
+        hit = self._cached(uid)
+        if hit:
+            return hit[1]
+        task = self._inflight.get(uid)
+        if task is None:
+            task = asyncio.create_task(self._fetch(uid))
+            self._inflight[uid] = task
+            task.add_done_callback(lambda _: self._inflight.pop(uid, None))
+        return await asyncio.shield(task)
+
+    async def display_names(self, guild, uids):
+        """{uid: name or None} for every id in ``uids``."""
+        uids = list(dict.fromkeys(uids))
+        names = await asyncio.gather(*(self.display_name(guild, uid) for uid in uids))
+        return dict(zip(uids, names))
+
+    def forget(self, uid):
+        self._cache.pop(uid, None)
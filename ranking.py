@@ -0,0 +1,89 @@
+"""Sorted Elo index for the leaderboard.
+
+Players are kept in a list sorted by (-elo, uid) so the best player is first
+and ties break on Discord id.  Lookups bisect into the list; updates move a
+single entry.  Only players above 0 Elo are ranked, matching the leaderboard.
+
+Rendered leaderboard pages are cached and dropped only when an update touches
+the rows they show.
+"""
+from bisect import bisect_left
+
+PAGE_SIZE = 10
+
+
+class RankIndex:
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self._keys = []      # sorted (-elo, uid)
+        self._elo = {}       # uid -> elo, ranked players only
+        self._pages = {}     # page number -> rendered page
+
+    def rebuild(self, elo_data):
+        self._elo = {uid: value for uid, value in elo_data.items() if value > 0}
+        self._keys = sorted((-value, uid) for uid, value in self._elo.items())
+        self._pages.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _position(self, uid):
+        value = self._elo.get(uid)
+        if value is None:
+            return None
+        return bisect_left(self._keys, (-value, uid))
+
+    def update(self, uid, value):
+        old_pos = self._position(uid)
+        if old_pos is not None:
+            del self._keys[old_pos]
+            del self._elo[uid]
+        new_pos = None
+        if value > 0:
+            self._elo[uid] = value
+            new_pos = bisect_left(self._keys, (-value, uid))
+            self._keys.insert(new_pos, (-value, uid))
+
+        # rows between the old and new position shift; a join or leave shifts
+        # everything below it
+        if old_pos is None and new_pos is None:
+            return
+        if old_pos is None or new_pos is None:
+            self._invalidate(old_pos if new_pos is None else new_pos, len(self._keys) + 1)
+        else:
+            self._invalidate(min(old_pos, new_pos), max(old_pos, new_pos) + 1)
+
+    def rank(self, uid):
+        """1-based rank, or None when the player is unranked."""
+        pos = self._position(uid)
+        return None if pos is None else pos + 1
+
+    def top(self, n):
+        return [(uid, -neg) for neg, uid in self._keys[:n]]
+
+    def page_count(self):
+        return max(1, -(-len(self._keys) // self.page_size))
+
+    def page(self, page):
+        start = (page - 1) * self.page_size
+        return [(uid, -neg) for neg, uid in self._keys[start:start + self.page_size]]
+
+    # === RENDER CACHE ===
+    def cached_page(self, page, render):
+        """Return the rendered page, calling ``render(rows, first_rank)`` on a miss."""
+        if page not in self._pages:
+            start = (page - 1) * self.page_size
+            self._pages[page] = render(self.page(page), start + 1)
+        return self._pages[page]
+
+    def invalidate_user(self, uid):
+        # e.g. the player's display name changed
+        pos = self._position(uid)
+        if pos is not None:
+            self._invalidate(pos, pos + 1)
+
+    def _invalidate(self, start, stop):
+        first = start // self.page_size + 1
+        last = (stop - 1) // self.page_size + 1
+        for page in [p for p in self._pages if first <= p <= last]:
+            del self._pages[page]
@@ -0,0 +1,78 @@
+"""Background granting of pending Elo rewards.
+
+Instead of every player polling Hypixel through /claim, one task walks all
+players with pending rewards at a steady pace (``requests_per_minute``),
+evaluates them the same way /claim does and commits the results together.
+Players whose stats have not caught up yet are retried with exponential
+backoff.
+"""
+import asyncio
+import time
+
+
+class PendingReconciler:
+    def __init__(self, store, fetch_stats, apply, requests_per_minute=30, interval=60,
+                 base_backoff=60, max_backoff=1800):
+        """fetch_stats(uid) -> (kills, finals) or None, may raise.
+        apply({uid: (kills, finals)}) -> set of uids that were granted Elo."""
+        self.store = store
+        self.fetch_stats = fetch_stats
+        self.apply = apply
+        self.spacing = 60 / requests_per_minute
+        self.budget = requests_per_minute
+        self.interval = interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._failures = {}    # uid -> consecutive passes without a reward
+        self._next_try = {}    # uid -> monotonic time of next attempt
+
+    def reset(self, uid):
+        self._failures.pop(uid, None)
+        self._next_try.pop(uid, None)
+
+    def _backoff(self, uid):
+        failures = self._failures.get(uid, 0) + 1
+        self._failures[uid] = failures
+        delay = min(self.base_backoff * 2 ** (failures - 1), self.max_backoff)
+        self._next_try[uid] = time.monotonic() + delay
+
+    def due(self):
+        now = time.monotonic()
+        pending = self.store.table("pending")
+        return [uid for uid, entries in pending.items() if entries and self._next_try.get(uid, 0) <= now]
+
+    async def run_once(self):
+        await self.store.refresh("pending")
+        due = self.due()[:self.budget]
+        results = {}
+        for uid in due:
+            try:
+                stats = await self.fetch_stats(uid)
+            except Exception as e:
+                print(f"❌ Reconciler could not fetch stats for {uid}: {e}")
+                stats = None
+            if stats is None:
+                self._backoff(uid)
+            else:
+                results[uid] = stats
+            await asyncio.sleep(self.spacing)
+
+        if not results:
+            return set()
+        granted = self.apply(results)
+        for uid in results:
+            if uid in granted:
+                self.reset(uid)
+            else:
+                self._backoff(uid)
+        # one write for the whole pass
+        await self.store.flush()
+        return granted
+
+    async def run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"❌ Reconciler pass failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,517 @@
+"""In-memory state store for the bot's persistent data.
+
+Every table (elo, pending rewards, linked accounts, parties, per-guild
+config) is loaded once and
+kept as a plain dict.  Commands read and write the dicts directly; writes only
+mark the key dirty.  A background task coalesces dirty keys and hands them to
+the backend, which persists them off the event loop.
+
+Values are treated as immutable once stored: replace them with ``set`` instead
+of mutating them in place, so a flush can take a cheap shallow snapshot.
+
+Two backends are available: JsonBackend (the original flat files) and
+SqliteBackend (one row per record).  Under JsonBackend the parties table is
+journaled: each change is appended to parties.journal and parties.json is only
+rewritten as a compacted snapshot once the journal grows or ages.  Import existing JSON files with
+
+    python storage.py migrate [path/to/ranked.db]
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import metrics
+
+TABLE_FILES = {
+    "elo": "elo.json",
+    "pending": "pending_elo.json",
+    "links": "linked_accounts.json",
+    "parties": "parties.json",
+    "guilds": "guilds.json",
+}
+
+# Tables another process writes too: the game server adds rewards to
+# pending_elo.json.  Before one of these is saved, changes made on disk since
+# it was loaded are merged in so they are not overwritten.
+SHARED_TABLES = {"pending"}
+
+# parties.json has always been written without indentation
+TABLE_INDENT = {"parties": None}
+
+# Tables that change often but are read rarely get an append-only journal next
+# to their snapshot file.  The snapshot is compacted when the journal passes
+# JOURNAL_MAX_BYTES or is older than SNAPSHOT_INTERVAL seconds.
+JOURNAL_FILES = {"parties": "parties.journal"}
+JOURNAL_MAX_BYTES = 256 * 1024
+SNAPSHOT_INTERVAL = 600
+
+DELETED = object()
+
+
+def atomic_write_json(path, data, indent=4):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class JsonBackend:
+    """One JSON file per table, rewritten atomically (temp file + rename).
+
+    Tables in ``journals`` are written as one JSON line per changed key
+    ({"k": key, "v": value} or {"k": key, "d": 1} for a delete) appended to
+    the journal, and loaded as snapshot + replayed journal.  Replaying is
+    idempotent, so a crash between writing a snapshot and truncating the
+    journal is harmless.
+    """
+
+    def __init__(self, files=None, journals=None, journal_max_bytes=JOURNAL_MAX_BYTES,
+                 snapshot_interval=SNAPSHOT_INTERVAL):
+        self.files = dict(files or TABLE_FILES)
+        if journals is None:
+            journals = {t: os.path.join(os.path.dirname(self.files[t]), name) for t, name in JOURNAL_FILES.items()}
+        self.journals = dict(journals)
+        self.journal_max_bytes = journal_max_bytes
+        self.snapshot_interval = snapshot_interval
+        self._stats = {}
+        self._state = {}        # journaled table -> current contents
+        self._snapshot_at = {}  # journaled table -> time of last snapshot
+
+    def full_rewrite(self, table):
+        return table not in self.journals
+
+    def _stat(self, table):
+        journal = self.journals.get(table)
+        return _stat(self.files[table]), journal and _stat(journal)
+
+    def load(self, table):
+        path = self.files[table]
+        self._stats[table] = self._stat(table)
+        data = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+        if table in self.journals:
+            self._replay(self.journals[table], data)
+            self._state[table] = dict(data)
+            self._snapshot_at[table] = time.monotonic()
+        return data
+
+    def _replay(self, path, data):
+        if not os.path.exists(path):
+            return
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record.get("d"):
+                    data.pop(record["k"], None)
+                else:
+                    data[record["k"]] = record["v"]
+                good += len(line)
+        if good != os.path.getsize(path):
+            # torn last record from a crash mid-append: cut it off so new
+            # records are not appended behind it
+            os.truncate(path, good)
+
+    def changed_externally(self, table):
+        return self._stat(table) != self._stats.get(table)
+
+    def write(self, table, data, changes):
+        if table in self.journals:
+            self._append(table, changes)
+        else:
+            atomic_write_json(self.files[table], data, indent=TABLE_INDENT.get(table, 4))
+        self._stats[table] = self._stat(table)
+
+    def _append(self, table, changes):
+        state = self._state.setdefault(table, {})
+        lines = []
+        for key, value in changes.items():
+            if value is DELETED:
+                state.pop(key, None)
+                lines.append(json.dumps({"k": key, "d": 1}))
+            else:
+                state[key] = value
+                lines.append(json.dumps({"k": key, "v": value}))
+        path = self.journals[table]
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        age = time.monotonic() - self._snapshot_at.setdefault(table, time.monotonic())
+        if os.path.getsize(path) >= self.journal_max_bytes or age >= self.snapshot_interval:
+            self.compact(table)
+
+    def compact(self, table):
+        """Write the table as a fresh snapshot and empty its journal."""
+        atomic_write_json(self.files[table], self._state.get(table, {}), indent=TABLE_INDENT.get(table, 4))
+        open(self.journals[table], "w").close()
+        self._snapshot_at[table] = time.monotonic()
+        self._stats[table] = self._stat(table)
+
+    def close(self):
+        for table, path in self.journals.items():
+            if table in self._state and os.path.exists(path) and os.path.getsize(path):
+                self.compact(table)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    discord_id TEXT PRIMARY KEY,
+    mc_name    TEXT NOT NULL,
+    uuid       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_links_mc_name ON links (mc_name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS elo (
+    discord_id TEXT PRIMARY KEY,
+    elo        INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_elo_elo ON elo (elo DESC);
+
+-- unused while the game server writes pending_elo.json (see SHARED_TABLES)
+CREATE TABLE IF NOT EXISTS pending_elo (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    discord_id TEXT NOT NULL,
+    entry      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_discord ON pending_elo (discord_id);
+
+-- leader_id holds "<guild id>:<leader id>"
+CREATE TABLE IF NOT EXISTS parties (
+    leader_id  TEXT PRIMARY KEY,
+    data       TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id   TEXT PRIMARY KEY,
+    config     TEXT NOT NULL
+);
+"""
+
+SQLITE_TABLES = {"links": "links", "elo": "elo", "pending": "pending_elo", "parties": "parties", "guilds": "guilds"}
+
+
+class SqliteBackend:
+    """Row-per-record storage in a single SQLite database (WAL mode).
+
+    Only the keys that changed are written, so saving one player's Elo costs
+    one row no matter how many players exist.  Methods are blocking; the
+    store calls them from a worker thread.
+
+    SHARED_TABLES stay in their JSON files: the game server still writes
+    pending_elo.json, so that file remains the hand-off between the two.
+    """
+
+    def __init__(self, path="ranked.db", files=None):
+        self.path = path
+        self.shared = JsonBackend(files, journals={})
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SQLITE_SCHEMA)
+        self._upgrade()
+        self._data_version = None
+
+    def full_rewrite(self, table):
+        return table in SHARED_TABLES
+
+    def _upgrade(self):
+        # databases created before links carried a UUID
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(links)")}
+        if "uuid" not in columns:
+            self._conn.execute("ALTER TABLE links ADD COLUMN uuid TEXT")
+
+    def _version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self, table):
+        if table in SHARED_TABLES:
+            return self.shared.load(table)
+        with self._lock:
+            self._data_version = self._version()
+            conn = self._conn
+            if table == "links":
+                return {
+                    uid: {"name": name, "uuid": uuid}
+                    for uid, name, uuid in conn.execute("SELECT discord_id, mc_name, uuid FROM links")
+                }
+            if table == "elo":
+                return {uid: value for uid, value in conn.execute("SELECT discord_id, elo FROM elo")}
+            if table == "pending":
+                pending = {}
+                for uid, entry in conn.execute("SELECT discord_id, entry FROM pending_elo ORDER BY id"):
+                    pending.setdefault(uid, []).append(json.loads(entry))
+                return pending
+            if table == "parties":
+                return {lid: json.loads(data) for lid, data in conn.execute("SELECT leader_id, data FROM parties")}
+            if table == "guilds":
+                return {gid: json.loads(config) for gid, config in conn.execute("SELECT guild_id, config FROM guilds")}
+            raise KeyError(table)
+
+    def changed_externally(self, table):
+        if table in SHARED_TABLES:
+            return self.shared.changed_externally(table)
+        # data_version only moves when another connection commits
+        with self._lock:
+            return self._version() != self._data_version
+
+    def _write_rows(self, table, changes):
+        conn = self._conn
+        for key, value in changes.items():
+            if table == "links":
+                if value is DELETED:
+                    conn.execute("DELETE FROM links WHERE discord_id = ?", (key,))
+                else:
+                    # legacy entries are a bare name
+                    name, uuid = (value, None) if isinstance(value, str) else (value["name"], value.get("uuid"))
+                    conn.execute(
+                        "INSERT INTO links (discord_id, mc_name, uuid) VALUES (?, ?, ?) "
+                        "ON CONFLICT(discord_id) DO UPDATE SET mc_name = excluded.mc_name, uuid = excluded.uuid",
+                        (key, name, uuid),
+                    )
+            elif table == "elo":
+                if value is DELETED:
+                    conn.execute("DELETE FROM elo WHERE discord_id = ?", (key,))
+                else:
+                    conn.execute(
+                        "INSERT INTO elo (discord_id, elo) VALUES (?, ?) "
+                        "ON CONFLICT(discord_id) DO UPDATE SET elo = excluded.elo",
+                        (key, value),
+                    )
+            elif table == "pending":
+                conn.execute("DELETE FROM pending_elo WHERE discord_id = ?", (key,))
+                if value is not DELETED:
+                    conn.executemany(
+                        "INSERT INTO pending_elo (discord_id, entry) VALUES (?, ?)",
+                        [(key, json.dumps(entry)) for entry in value],
+                    )
+            elif table == "parties":
+                if value is DELETED:
+                    conn.execute("DELETE FROM parties WHERE leader_id = ?", (key,))
+                else:
+                    conn.execute(
+                        "INSERT INTO parties (leader_id, data) VALUES (?, ?) "
+                        "ON CONFLICT(leader_id) DO UPDATE SET data = excluded.data",
+                        (key, json.dumps(value)),
+                    )
+            elif table == "guilds":
+                if value is DELETED:
+                    conn.execute("DELETE FROM guilds WHERE guild_id = ?", (key,))
+                else:
+                    conn.execute(
+                        "INSERT INTO guilds (guild_id, config) VALUES (?, ?) "
+                        "ON CONFLICT(guild_id) DO UPDATE SET config = excluded.config",
+                        (key, json.dumps(value)),
+                    )
+            else:
+                raise KeyError(table)
+
+    def write(self, table, data, changes):
+        if table in SHARED_TABLES:
+            return self.shared.write(table, data, changes)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_rows(table, changes)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def import_table(self, table, data):
+        """Replace a whole table (used by the JSON migration)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(f"DELETE FROM {SQLITE_TABLES[table]}")
+                self._write_rows(table, data)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+
+def make_backend(kind=None, files=None, sqlite_path=None):
+    """Pick the backend from STORAGE_BACKEND (json or sqlite)."""
+    kind = (kind or os.getenv("STORAGE_BACKEND") or "json").lower()
+    if kind == "sqlite":
+        return SqliteBackend(sqlite_path or os.getenv("SQLITE_PATH") or "ranked.db", files)
+    if kind == "json":
+        return JsonBackend(files)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def migrate_json_to_sqlite(db_path="ranked.db", files=None):
+    source = JsonBackend(files)
+    target = SqliteBackend(db_path)
+    counts = {}
+    try:
+        for table in TABLE_FILES:
+            if table in SHARED_TABLES:
+                continue  # read from its JSON file under either backend
+            data = source.load(table)
+            target.import_table(table, data)
+            counts[table] = len(data)
+    finally:
+        target.close()
+    return counts
+
+
+class StateStore:
+    def __init__(self, backend, flush_interval=2.0):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.tables = {name: {} for name in TABLE_FILES}
+        self._dirty = {name: set() for name in TABLE_FILES}
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self.loaded = False
+
+    # === LOAD ===
+    async def load(self):
+        # Tables are refilled in place so module-level aliases stay valid.
+        for name, table in self.tables.items():
+            with metrics.timer("storage_load", table=name):
+                data = await asyncio.to_thread(self.backend.load, name)
+            table.clear()
+            table.update(data)
+            self._dirty[name].clear()
+        self.loaded = True
+
+    async def refresh(self, name):
+        """Pick up edits made to a table by another process (e.g. the game
+        server appending to pending_elo.json).  Local unflushed keys win."""
+        async with self._flush_lock:
+            await self._merge_external(name)
+
+    async def _merge_external(self, name):
+        # caller holds _flush_lock
+        if not self.backend.changed_externally(name):
+            return
+        with metrics.timer("storage_load", table=name):
+            data = await asyncio.to_thread(self.backend.load, name)
+        table = self.tables[name]
+        local = {k: table.get(k, DELETED) for k in self._dirty[name]}
+        table.clear()
+        table.update(data)
+        for key, value in local.items():
+            if value is DELETED:
+                table.pop(key, None)
+            else:
+                table[key] = value
+
+    # === ACCESS ===
+    def table(self, name):
+        return self.tables[name]
+
+    def get(self, name, key, default=None):
+        return self.tables[name].get(key, default)
+
+    def set(self, name, key, value):
+        self.tables[name][key] = value
+        self.mark(name, key)
+
+    def delete(self, name, key):
+        if self.tables[name].pop(key, DELETED) is not DELETED:
+            self.mark(name, key)
+
+    def mark(self, name, key):
+        self._dirty[name].add(key)
+        self._wake.set()
+
+    def pending_writes(self):
+        return sum(len(keys) for keys in self._dirty.values())
+
+    # === FLUSH ===
+    async def flush(self):
+        async with self._flush_lock:
+            for name, keys in self._dirty.items():
+                if not keys:
+                    continue
+                if name in SHARED_TABLES:
+                    # the local dirty keys go on top of whatever the other writer added
+                    try:
+                        await self._merge_external(name)
+                    except Exception as e:
+                        self._wake.set()
+                        print(f"❌ Failed to reload {name} before saving: {e}")
+                        continue
+                self._dirty[name] = set()
+                table = self.tables[name]
+                changes = {k: table.get(k, DELETED) for k in keys}
+                snapshot = dict(table) if self.backend.full_rewrite(name) else None
+                try:
+                    with metrics.timer("storage_write", table=name):
+                        await asyncio.to_thread(self.backend.write, name, snapshot, changes)
+                except Exception as e:
+                    # keep the keys dirty so the next pass retries them
+                    self._dirty[name] |= keys
+                    self._wake.set()
+                    print(f"❌ Failed to save {name}: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await self._wake.wait()
+            # let writes that arrive in the next few seconds share one flush
+            await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self.backend.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("usage: python storage.py migrate [path/to/ranked.db]")
+        sys.exit(1)
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("SQLITE_PATH", "ranked.db")
+    for table, count in migrate_json_to_sqlite(db_path).items():
+        print(f"✅ Imported {count} {table} records into {db_path}")
@@ -0,0 +1,113 @@
+"""Pre-created red/green voice channel pairs for /party forcequeue.
+
+Creating and deleting two channels per match costs four calls in Discord's
+channel-management rate limit.  The pool keeps ``min_idle`` pairs ready under
+the category; a party leases a pair and it comes back once both channels are
+empty again (or the party is gone).  Names
+stay fixed for the life of a pair because channel renames are even more
+tightly rate limited than creates.  Surplus idle pairs above ``max_idle`` are
+deleted, and pairs left over from a previous run are adopted on startup.
+"""
+import asyncio
+import re
+import secrets
+
+PAIR_NAME = re.compile(r"^(red|green)-([a-z0-9]{6})$")
+
+
+class TempVCPool:
+    def __init__(self, category_id, min_idle=2, max_idle=6, released=None):
+        """released(owner, pair) is called when a leased pair comes back."""
+        self.category_id = category_id
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.idle = []       # [(red_id, green_id)]
+        self.leased = {}     # (red_id, green_id) -> owner (the party using it)
+        self._released = released or (lambda owner, pair: None)
+        self._lock = asyncio.Lock()
+        self._refill = None
+        self._adopted = False
+
+    def owner(self, pair):
+        return self.leased.get(tuple(pair))
+
+    def reserve(self, pair, owner):
+        """Mark a pair as leased, e.g. one a party loaded from disk still holds."""
+        self.leased[tuple(pair)] = owner
+
+    def _pair_channels(self, guild, pair):
+        channels = [guild.get_channel(vc_id) for vc_id in pair]
+        return None if None in channels else channels
+
+    async def _create_pair(self, guild):
+        category = guild.get_channel(self.category_id)
+        code = secrets.token_hex(3)
+        red = await guild.create_voice_channel(f"red-{code}", category=category)
+        green = await guild.create_voice_channel(f"green-{code}", category=category)
+        return red.id, green.id
+
+    async def warm(self, guild):
+        """Adopt empty pairs already in the category, then top up to min_idle.
+        Pairs that are reserved stay with their owners."""
+        category = guild.get_channel(self.category_id)
+        if category is not None and not self._adopted:
+            self._adopted = True
+            reserved = {vc_id for pair in self.leased for vc_id in pair}
+            halves = {}
+            for vc in category.voice_channels:
+                match = PAIR_NAME.match(vc.name)
+                if match and not vc.members and vc.id not in reserved:
+                    halves.setdefault(match.group(2), {})[match.group(1)] = vc.id
+            self.idle += [(h["red"], h["green"]) for h in halves.values() if len(h) == 2]
+        await self._top_up(guild)
+
+    async def _top_up(self, guild):
+        if guild.get_channel(self.category_id) is None:
+            return  # category deleted or not visible: don't create top-level channels
+        async with self._lock:
+            while len(self.idle) < self.min_idle:
+                self.idle.append(await self._create_pair(guild))
+
+    def _schedule_top_up(self, guild):
+        if self._refill is None or self._refill.done():
+            self._refill = asyncio.create_task(self._top_up(guild))
+
+    async def lease(self, guild, owner=None):
+        """Return (red_vc, green_vc) for a match."""
+        while self.idle:
+            pair = self.idle.pop()
+            channels = self._pair_channels(guild, pair)
+            if channels:
+                break
+        else:
+            # pool ran dry: create one now, the refill catches up in the background
+            pair = await self._create_pair(guild)
+            channels = self._pair_channels(guild, pair)
+        self.leased[pair] = owner
+        self._schedule_top_up(guild)
+        return channels
+
+    async def give_back(self, guild, pair):
+        pair = tuple(pair)
+        if pair not in self.leased:
+            return  # already back
+        self._released(self.leased.pop(pair), pair)
+        channels = self._pair_channels(guild, pair)
+        if channels is None:
+            return
+        if len(self.idle) >= self.max_idle:
+            for vc in channels:
+                await vc.delete()
+            return
+        self.idle.append(pair)
+
+    def on_voice_state_update(self, member, before, after):
+        # like LobbyAllocator: a leased pair comes back once both channels are empty
+        if before.channel is None or (after.channel is not None and after.channel.id == before.channel.id):
+            return
+        guild = before.channel.guild
+        for pair in self.leased:
+            if before.channel.id in pair:
+                if all(not (vc := guild.get_channel(vc_id)) or not vc.members for vc_id in pair):
+                    asyncio.create_task(self.give_back(guild, pair))
+                return
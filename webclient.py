@@ -0,0 +1,58 @@
+"""Bot-lifetime HTTP client for the Mojang and Hypixel APIs.
+
+One pooled aiohttp session is opened when the bot starts and closed when it
+shuts down, so repeated calls reuse warm keep-alive connections instead of
+paying for a new TCP and TLS handshake each time.
+"""
+import aiohttp
+
+import metrics
+
+
+class HttpClient:
+    def __init__(self, limit_per_host=8, connect_timeout=3, read_timeout=8, dns_ttl=300, keepalive=60):
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self._session = None
+
+    async def start(self):
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HttpClient.start() has not been called")
+        return self._session
+
+    async def _request(self, method, url, service, kwargs):
+        # service labels the http_request_* metrics (mojang, hypixel, ...)
+        with metrics.timer("http_request", service=service):
+            async with self.session.request(method, url, **kwargs) as r:
+                try:
+                    data = await r.json(content_type=None)
+                except ValueError:
+                    data = None
+        metrics.inc("http_responses_total", service=service, status=r.status)
+        return r.status, r.headers, data
+
+    async def get_json(self, url, service="http", **kwargs):
+        """GET ``url`` and return (status, headers, body).  body is None when
+        the response is not JSON."""
+        return await self._request("GET", url, service, kwargs)
+
+    async def post_json(self, url, service="http", **kwargs):
+        return await self._request("POST", url, service, kwargs)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,258 @@
+"""Optional worker processes for the work that can hold up the event loop.
+
+The bot process keeps the gateway connection, the store and all party and
+queue state; it is the only writer of the data files.  With workers it hands
+these off and only awaits the answer:
+
+    bedwars_stats  Hypixel lookups for /claim and the pending-Elo reconciler
+    resolve        Mojang name -> UUID for /link and /claim
+    balance_teams  the Elo team split for matches and /party queue
+
+Workers hold no bot state (each has its own HTTP session, rate limiter and
+caches) and talk to the bot over a Unix socket, one JSON object per line:
+
+    -> {"id": 1, "op": "bedwars_stats", "args": {"uuid": "..."}}
+    <- {"id": 1, "result": [kills, finals]}
+    <- {"id": 1, "error": "HypixelError", "message": "..."}
+
+WORKERS=N in the bot's environment starts N workers next to it (as
+``python workers.py`` child processes).  A worker can also run on its own,
+e.g. under systemd, and be listed in WORKER_SOCKETS:
+
+    python workers.py /run/ranked/worker-0.sock
+"""
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from hypixel import HypixelClient, HypixelError, HYPIXEL_API
+from mojang import MojangResolver, MojangError, MOJANG_API
+from partition import balance_teams, DEFAULT_DEADLINE
+from webclient import HttpClient
+
+MAX_LINE = 1 << 20
+
+# errors a worker reports are raised again as these in the bot
+ERRORS = {"HypixelError": HypixelError, "MojangError": MojangError}
+
+# lookups for the same player go to the same worker, so its cache and
+# in-flight de-duplication still work across workers
+AFFINITY = {"bedwars_stats": "uuid", "resolve": "name"}
+
+
+class WorkerError(Exception):
+    """No worker could run the call (none connected, or it went away)."""
+
+
+# === WORKER SIDE ===
+class Worker:
+    def __init__(self, api_key=None, mojang_url=MOJANG_API, hypixel_url=HYPIXEL_API):
+        self.http = HttpClient()
+        self.mojang = MojangResolver(self.http, base_url=mojang_url)
+        self.hypixel = HypixelClient(self.http, api_key=api_key, base_url=hypixel_url)
+        self.ops = {
+            "bedwars_stats": self.hypixel.bedwars_stats,
+            "resolve": self.mojang.resolve,
+            "balance_teams": self.balance_teams,
+        }
+
+    async def balance_teams(self, players, elos, together=(), deadline=DEFAULT_DEADLINE):
+        # elos is keyed by str(player): JSON object keys are always strings
+        return balance_teams(players, lambda p: elos.get(str(p), 0), together, deadline=deadline)
+
+    async def _run(self, request, writer):
+        reply = {"id": request["id"]}
+        try:
+            reply["result"] = await self.ops[request["op"]](**request.get("args", {}))
+        except Exception as e:
+            reply["error"] = type(e).__name__
+            reply["message"] = str(e)
+        writer.write(json.dumps(reply).encode() + b"\n")
+
+    async def handle(self, reader, writer):
+        running = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._run(json.loads(line), writer))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            for task in running:
+                task.cancel()
+            writer.close()
+
+
+async def serve(path, **worker_args):
+    worker = Worker(**worker_args)
+    await worker.http.start()
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(worker.handle, path, limit=MAX_LINE)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await worker.http.close()
+
+
+# === BOT SIDE ===
+class _Connection:
+    __slots__ = ("path", "reader", "writer", "pending", "task")
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = None
+        self.writer = None
+        self.pending = {}   # request id -> Future
+        self.task = None
+
+    @property
+    def up(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+
+class WorkerPool:
+    def __init__(self, paths=(), timeout=30, reconnect_delay=2):
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self._connections = [_Connection(path) for path in paths]
+        self._processes = {}   # socket path -> Popen, for workers started by spawn()
+        self._env = None
+        self._socket_dir = None
+        self._ids = itertools.count(1)
+        self._closed = False
+
+    @property
+    def paths(self):
+        return [c.path for c in self._connections]
+
+    def available(self):
+        return any(c.up for c in self._connections)
+
+    def spawn(self, count, env=None):
+        """Start ``count`` workers on sockets in a private temp dir; ``env``
+        is added to their environment."""
+        self._env = {**os.environ, **(env or {})}
+        self._socket_dir = tempfile.mkdtemp(prefix="ranked-workers-")
+        for i in range(count):
+            path = os.path.join(self._socket_dir, f"worker-{i}.sock")
+            self._start_process(path)
+            self._connections.append(_Connection(path))
+
+    def _start_process(self, path):
+        self._processes[path] = subprocess.Popen([sys.executable, os.path.abspath(__file__), path], env=self._env)
+
+    async def start(self, wait=10):
+        """Connect to every worker, waiting up to ``wait`` seconds for new ones."""
+        loop = asyncio.get_running_loop()
+        for conn in self._connections:
+            conn.task = asyncio.create_task(self._keep_connected(conn, wait))
+        deadline = loop.time() + wait
+        while not all(c.up for c in self._connections) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        print(f"✅ Connected to {sum(c.up for c in self._connections)}/{len(self._connections)} workers.")
+
+    async def _keep_connected(self, conn, wait):
+        # (re)connects for as long as the pool is open; a spawned worker that
+        # exited is started again
+        loop = asyncio.get_running_loop()
+        starting_until = loop.time() + wait
+        while not self._closed:
+            try:
+                conn.reader, conn.writer = await asyncio.open_unix_connection(conn.path, limit=MAX_LINE)
+            except OSError:
+                # a new worker takes a moment to create its socket
+                if loop.time() < starting_until:
+                    await asyncio.sleep(0.05)
+                    continue
+                process = self._processes.get(conn.path)
+                if process is not None and process.poll() is not None:
+                    print(f"❌ Worker {conn.path} exited ({process.returncode}), restarting it")
+                    self._start_process(conn.path)
+                    starting_until = loop.time() + wait
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            await self._read_replies(conn)
+
+    async def _read_replies(self, conn):
+        try:
+            while line := await conn.reader.readline():
+                reply = json.loads(line)
+                future = conn.pending.pop(reply["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    error = ERRORS.get(reply["error"], WorkerError)
+                    future.set_exception(error(reply["message"]))
+                else:
+                    future.set_result(reply["result"])
+        except (OSError, ValueError) as e:
+            print(f"❌ Lost worker {conn.path}: {e}")
+        finally:
+            conn.writer.close()
+            conn.writer = None
+            for future in conn.pending.values():
+                if not future.done():
+                    future.set_exception(WorkerError(f"worker {conn.path} went away"))
+            conn.pending.clear()
+
+    async def call(self, op, timeout=None, **args):
+        """Run ``op`` on a worker (the least busy one, unless it is a player
+        lookup).  Raises WorkerError when no worker is connected and
+        asyncio.TimeoutError after ``timeout`` (default: the pool's)."""
+        live = [c for c in self._connections if c.up]
+        if not live:
+            raise WorkerError("no worker connected")
+        field = AFFINITY.get(op)
+        if field is not None:
+            conn = live[hash(str(args[field]).lower()) % len(live)]
+        else:
+            conn = min(live, key=lambda c: len(c.pending))
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        conn.pending[request_id] = future
+        conn.writer.write(json.dumps({"id": request_id, "op": op, "args": args}).encode() + b"\n")
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        finally:
+            conn.pending.pop(request_id, None)
+
+    async def close(self):
+        self._closed = True
+        for conn in self._connections:
+            if conn.task:
+                conn.task.cancel()
+            if conn.writer:
+                conn.writer.close()
+        for process in self._processes.values():
+            process.terminate()
+        for process in self._processes.values():
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                await asyncio.to_thread(process.wait, 5)
+        if self._socket_dir:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python workers.py SOCKET_PATH")
+        sys.exit(1)
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.getenv("HYPIXEL_API_KEY")
+    if api_key is None and os.path.exists("api.json"):
+        with open("api.json", "r") as f:
+            api_key = json.load(f).get("hypixel_api_key")
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(
+            sys.argv[1],
+            api_key=api_key,
+            mojang_url=os.getenv("MOJANG_API_URL", MOJANG_API),
+            hypixel_url=os.getenv("HYPIXEL_API_URL", HYPIXEL_API),
+        ))